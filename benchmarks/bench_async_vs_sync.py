@@ -0,0 +1,69 @@
+"""Compares GET /icecream latency of the blocking and the native async data path.
+
+``sync_app`` reproduces the previous handler, which awaited nothing and called
+the synchronous ``Icecream_DB`` from inside ``async def`` (blocking the event
+loop for every round-trip). The async path is the real ``app.app``.
+
+Usage (from the repository root, with ICECREAM_DB_* pointing at a database)::
+
+    python benchmarks/bench_async_vs_sync.py --concurrency 200 --requests 20000
+"""
+import argparse
+import asyncio
+import json
+
+import bench_util  # noqa: F401  (puts src/ on sys.path)
+from bench_util import BENCH_DIR, drive, serve
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+sync_app = FastAPI()
+
+
+@sync_app.get("/")
+async def home():
+    return JSONResponse(content={"message": "sync baseline"})
+
+
+@sync_app.get("/icecream")
+async def geticecreams(_req: Request):
+    from config import get_db_access
+    from icecream_db import Icecream_DB
+
+    Pool = get_db_access().ConnectionPool
+
+    requested_ids = _req.query_params.getlist("id")
+    if requested_ids:
+        _rows = Icecream_DB.get_icecream_by_ids(pool=Pool, ids=requested_ids)
+    else:
+        _rows = Icecream_DB.get_all_icecream(pool=Pool)
+    return JSONResponse(content=[x.__dict__ for x in _rows])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--port", type=int, default=10401)
+    parser.add_argument("--path", default="/icecream?id=1&id=2&id=3")
+    args = parser.parse_args()
+
+    async def _get(client, _i):
+        return await client.get(args.path)
+
+    results = {}
+    for label, app_ref, app_dir in (
+        ("sync", "bench_async_vs_sync:sync_app", BENCH_DIR),
+        ("async", "app:app", None),
+    ):
+        _kwargs = {"app_dir": app_dir} if app_dir else {}
+        with serve(app_ref, args.port, **_kwargs) as base_url:
+            results[label] = asyncio.run(drive(base_url, _get, args.concurrency, args.requests))
+
+    print(json.dumps({"concurrency": args.concurrency, "path": args.path, **results}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,53 @@
+"""Queries issued for concurrent point lookups, with and without micro-batching.
+
+Starts the app with the lookup cache and single-flight disabled, so every
+request reaches the database, and drives `GET /icecream?id=<n>` for random
+ids. Reports throughput, latency and, with batching, how many queries the
+batcher issued (from /cache/stats).
+
+Usage::
+
+    python benchmarks/bench_batching.py --concurrency 200 --requests 20000
+"""
+import argparse
+import asyncio
+import json
+import random
+
+import bench_util  # noqa: F401  (puts src/ on sys.path)
+from bench_util import drive, serve
+
+import httpx
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--port", type=int, default=10402)
+    parser.add_argument("--max-id", type=int, default=1000)
+    parser.add_argument("--window-ms", default="1")
+    args = parser.parse_args()
+
+    async def _get(client, _i):
+        return await client.get(f"/icecream?id={random.randint(1, args.max_id)}")
+
+    results = {}
+    for label, window_ms in (("unbatched", "0"), ("batched", args.window_ms)):
+        _env = {
+            "APP_WORKERS": "1",
+            "ICECREAM_CACHE_MAX_SIZE": "0",
+            "ICECREAM_SINGLE_FLIGHT": "false",
+            "ICECREAM_BATCH_WINDOW_MS": window_ms,
+        }
+        with serve("app:app", args.port, extra_env=_env) as base_url:
+            results[label] = asyncio.run(drive(base_url, _get, args.concurrency, args.requests))
+            batcher_stats = httpx.get(f"{base_url}/cache/stats").json().get("batcher")
+            results[label]["queries"] = batcher_stats["batches"] if batcher_stats else args.requests
+
+    print(json.dumps({"concurrency": args.concurrency, "window_ms": args.window_ms, **results}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
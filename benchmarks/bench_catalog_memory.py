@@ -0,0 +1,111 @@
+"""Memory of the in-process catalog: ``IceCream`` models against ``Icecream_Store``.
+
+No database is needed. Rows are synthesized in the shape psycopg returns
+them, with a distinct string object per value as the driver produces.
+Each representation is built in a fresh interpreter. Memory is what
+``tracemalloc`` sees retained once the rows are gone; build and encode
+times are taken with tracing off.
+
+Usage::
+
+    python benchmarks/bench_catalog_memory.py --sizes 10000 1000000
+"""
+import argparse
+import gc
+import json
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import bench_util  # noqa: F401  (puts src/ on sys.path)
+from bench_row_mapping import COLUMN_MAP
+
+REPRESENTATIONS = ("models", "store", "store_with_name_index")
+
+
+def make_rows(count: int) -> list[tuple]:
+    return [
+        (
+            i,
+            f"flavor {i}",
+            float(i % 9 + 1) + 0.25,
+            i % 200 + 1,
+            i % 3 != 0,
+            f"A reasonably long description of frozen dessert number {i}." if i % 5 else None,
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def measure(representation: str, size: int) -> dict:
+    from icecream_db import Row2Icecreams
+    from icecream_json import encode_icecreams
+    from icecream_search import Name_Prefix_Index
+    from icecream_store import Icecream_Store
+
+    def build(rows):
+        if representation == "models":
+            return Row2Icecreams(COLUMN_MAP, rows)
+        return Icecream_Store.from_rows(COLUMN_MAP, rows)
+
+    # Timed without tracemalloc, which slows allocations down unevenly.
+    rows = make_rows(size)
+    _start = time.perf_counter()
+    build(rows)
+    build_s = time.perf_counter() - _start
+    del rows
+    gc.collect()
+
+    tracemalloc.start()
+    rows = make_rows(size)
+    catalog = build(rows)
+    name_index = Name_Prefix_Index(catalog) if representation == "store_with_name_index" else None
+    del rows
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    _start = time.perf_counter()
+    body = encode_icecreams(catalog) if representation == "models" else catalog.to_json()
+    encode_s = time.perf_counter() - _start
+    assert name_index is None or len(name_index) == size
+
+    return {
+        "representation": representation,
+        "icecreams": size,
+        "retained_mb": round(retained / 2**20, 1),
+        "bytes_per_icecream": round(retained / size),
+        "build_ms": round(build_s * 1000, 1),
+        "encode_ms": round(encode_s * 1000, 1),
+        "body_mb": round(len(body) / 2**20, 1),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 1000000])
+    parser.add_argument("--measure", nargs=2, metavar=("REPRESENTATION", "SIZE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.measure[0], int(args.measure[1]))))
+        return 0
+
+    results = []
+    for size in args.sizes:
+        for representation in REPRESENTATIONS:
+            proc = subprocess.run(
+                [sys.executable, __file__, "--measure", representation, str(size)],
+                capture_output=True, text=True, check=True,
+            )
+            results.append(json.loads(proc.stdout))
+        models, store = results[-3]["retained_mb"], results[-2]["retained_mb"]
+        results.append({"icecreams": size, "store_memory_vs_models": round(store / models, 3) if models else None})
+
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,137 @@
+"""Startup cost: ``-X importtime`` per module against a budget, and time to ready.
+
+Each module is imported in a fresh interpreter several times; the median
+total is compared with its budget, and the slowest direct imports are
+listed. ``config`` and ``main`` must also not import psycopg: the server's
+supervisor process only needs the settings, and the database driver is
+loaded by the workers.
+
+With ``--ready``, also measures the time from starting ``uvicorn app:app``
+until ``/health/ready`` answers 200 (needs the ``ICECREAM_DB_*`` database).
+
+Exits with status 1 when a budget is exceeded, so it can gate CI::
+
+    python benchmarks/bench_import_time.py --budget app=1200 --ready
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+from bench_util import SRC_DIR
+
+# Milliseconds; generous, to absorb slow CI machines.
+DEFAULT_BUDGETS = {"config": 50, "main": 300, "app": 1500}
+
+# Modules that must stay out of an import, so that it remains cheap.
+LAZY_IMPORTS = {"config": ("psycopg",), "main": ("psycopg",)}
+
+
+def importtime(module: str) -> list[tuple[int, int, str]]:
+    """``(cumulative_us, depth, name)`` per module imported by ``import module`` in a fresh interpreter."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SRC_DIR, capture_output=True, text=True, check=True,
+    )
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((int(cumulative), depth, name.strip()))
+    return entries
+
+
+def measure_module(module: str, runs: int) -> dict:
+    samples = []
+    for _ in range(runs):
+        entries = importtime(module)
+        total = next(x for x, depth, name in entries if depth == 0 and name == module)
+        samples.append((total, entries))
+    samples.sort(key=lambda x: x[0])
+    _, entries = samples[len(samples) // 2]
+
+    # A module's imports are listed before it, back to the previous top-level
+    # entry; earlier ones come from interpreter startup (site).
+    end = next(i for i, (_, depth, name) in enumerate(entries) if depth == 0 and name == module)
+    start = end
+    while start > 0 and entries[start - 1][1] > 0:
+        start -= 1
+    subtree = entries[start:end]
+    slowest = sorted(((x, name) for x, depth, name in subtree if depth == 1), reverse=True)[:5]
+    imported = {name for _, _, name in subtree}
+    return {
+        "module": module,
+        "median_ms": round(statistics.median(x for x, _ in samples) / 1000, 1),
+        "slowest_imports_ms": {name: round(x / 1000, 1) for x, name in slowest},
+        "unexpected_imports": sorted(x for x in LAZY_IMPORTS.get(module, ()) if x in imported),
+    }
+
+
+def time_to_ready(port: int) -> float:
+    """Seconds from starting uvicorn until ``/health/ready`` returns 200."""
+    env = dict(os.environ, PYTHONPATH=str(SRC_DIR))
+    _start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--app-dir", str(SRC_DIR),
+         "--port", str(port), "--log-level", "warning", "--no-access-log"],
+        env=env,
+    )
+    try:
+        _deadline = time.monotonic() + 60
+        while True:
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/health/ready", timeout=1).status_code == 200:
+                    return time.perf_counter() - _start
+            except httpx.HTTPError:
+                pass
+            if proc.poll() is not None or time.monotonic() > _deadline:
+                raise RuntimeError("uvicorn app:app did not become ready")
+            time.sleep(0.01)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modules", nargs="+", default=list(DEFAULT_BUDGETS))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", action="append", default=[], metavar="MODULE=MS", help="override a budget")
+    parser.add_argument("--ready", action="store_true", help="also measure the time to /health/ready")
+    parser.add_argument("--port", type=int, default=10420)
+    args = parser.parse_args()
+
+    budgets = dict(DEFAULT_BUDGETS)
+    for _budget in args.budget:
+        _module, _ms = _budget.split("=", 1)
+        budgets[_module] = float(_ms)
+
+    failed = False
+    results = []
+    for module in args.modules:
+        result = measure_module(module, args.runs)
+        result["budget_ms"] = budgets.get(module)
+        result["ok"] = not result["unexpected_imports"] and (
+            result["budget_ms"] is None or result["median_ms"] <= result["budget_ms"]
+        )
+        failed = failed or not result["ok"]
+        results.append(result)
+
+    output = {"imports": results}
+    if args.ready:
+        _samples = sorted(time_to_ready(args.port) for _ in range(args.runs))
+        output["time_to_ready_ms"] = round(statistics.median(_samples) * 1000, 1)
+
+    print(json.dumps(output, indent=2))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
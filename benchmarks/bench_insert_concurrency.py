@@ -0,0 +1,81 @@
+"""Insert throughput with 1..N parallel writers: table lock vs identity sequence.
+
+``legacy_insert`` reproduces the previous ``insert_icecream`` (LOCK TABLE in
+EXCLUSIVE MODE + MAX("ID") + 1); the sequence path is the current
+``Icecream_DB.insert_icecream``. Rows created by the run are deleted at the
+end. Requires migration 0001_icecream_id_identity.
+
+Usage::
+
+    python benchmarks/bench_insert_concurrency.py --writers 1 2 4 8 16 --inserts 200
+"""
+import argparse
+import json
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import bench_util  # noqa: F401  (puts src/ on sys.path)
+
+from psycopg_pool import ConnectionPool
+
+from config import get_db_access
+from icecream import IceCream
+from icecream_db import Icecream_DB
+
+
+def legacy_insert(pool: ConnectionPool, icecream: IceCream) -> IceCream:
+    with pool.connection() as cnx:
+        cnx.execute('LOCK TABLE public."Icecream" IN EXCLUSIVE MODE')
+        last_id = cnx.execute('SELECT MAX("ID") FROM public."Icecream"').fetchone()[0] or 0
+        icecream.Id = last_id + 1
+        cnx.execute(
+            """
+            INSERT INTO public."Icecream" ("ID", "Name", "Price", "Quantity", "OnDisplay", "Description")
+            VALUES (%s, %s, %s::numeric, %s, %s, %s)
+            """,
+            (icecream.Id, icecream.Name, icecream.Price, icecream.Quantity, icecream.OnDisplay, icecream.Description),
+        )
+    return icecream
+
+
+def run(insert, writers: int, inserts: int, prefix: str) -> dict:
+    pool = ConnectionPool(get_db_access().conninfo, min_size=writers, max_size=writers, open=True)
+    try:
+        pool.wait()
+
+        def _writer(w: int):
+            for i in range(inserts):
+                insert(pool, IceCream(
+                    Id=1, Name=f"{prefix}-{w}-{i}", Price=1.5, Quantity=10, OnDisplay=True, Description="bench",
+                ))
+
+        _start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=writers) as executor:
+            list(executor.map(_writer, range(writers)))
+        elapsed = time.perf_counter() - _start
+        return {"writers": writers, "inserts": writers * inserts, "inserts_per_s": round(writers * inserts / elapsed, 1)}
+    finally:
+        with pool.connection() as cnx:
+            cnx.execute('DELETE FROM public."Icecream" WHERE "Name" LIKE %s', (f"{prefix}-%",))
+        pool.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--inserts", type=int, default=200, help="inserts per writer")
+    args = parser.parse_args()
+
+    prefix = f"bench-{uuid.uuid4().hex[:8]}"
+    results = {"lock_table": [], "sequence": []}
+    for writers in args.writers:
+        results["lock_table"].append(run(legacy_insert, writers, args.inserts, prefix))
+        results["sequence"].append(run(Icecream_DB.insert_icecream, writers, args.inserts, prefix))
+
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
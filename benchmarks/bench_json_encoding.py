@@ -0,0 +1,68 @@
+"""Microbenchmark of response encoding for catalogs of 10, 1k and 10k ice creams.
+
+Compares the shared ``icecream_json.encode`` (pydantic-core, straight to
+bytes) with the paths it replaced: ``JSONResponse`` over ``x.__dict__``
+dicts, and the ``json.loads(json.dumps(...))`` round-trip followed by
+``JSONResponse`` that the original route handlers used.
+
+Usage::
+
+    python benchmarks/bench_json_encoding.py --sizes 10 1000 10000
+"""
+import argparse
+import json
+
+import bench_util  # noqa: F401  (puts src/ on sys.path)
+from bench_row_mapping import COLUMN_MAP, best_of, make_rows
+
+from fastapi.responses import JSONResponse
+
+from icecream_db import Row2Icecreams
+from icecream_json import Icecream_JSONResponse
+
+
+def dict_response(icecreams) -> bytes:
+    return JSONResponse(content=[x.__dict__ for x in icecreams]).body
+
+
+def round_trip_response(icecreams) -> bytes:
+    return JSONResponse(content=json.loads(json.dumps([x.__dict__ for x in icecreams]))).body
+
+
+def shared_response(icecreams) -> bytes:
+    return Icecream_JSONResponse(content=icecreams).body
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        icecreams = Row2Icecreams(COLUMN_MAP, make_rows(size, money_text=False))
+        assert json.loads(shared_response(icecreams)) == json.loads(dict_response(icecreams))
+
+        _number = max(1, 10000 // size)
+        _timings = {}
+        for label, encoder in (
+            ("round_trip", round_trip_response),
+            ("dict", dict_response),
+            ("shared", shared_response),
+        ):
+            _timings[label] = best_of(lambda: [encoder(icecreams) for _ in range(_number)], args.repeat) / _number
+
+        results.append({
+            "icecreams": size,
+            **{f"{label}_us": round(t * 1e6, 1) for label, t in _timings.items()},
+            "speedup_vs_round_trip": round(_timings["round_trip"] / _timings["shared"], 2),
+            "speedup_vs_dict": round(_timings["dict"] / _timings["shared"], 2),
+        })
+
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,66 @@
+"""Per-query latency of the catalog lookups with and without prepared statements.
+
+Runs each fixed statement from ``Icecream_SQL`` repeatedly on one connection,
+once with ``prepare=False`` (parsed and planned on every execution) and once
+with ``prepare=True`` (prepared on first use, then only bound and executed).
+
+Usage::
+
+    python benchmarks/bench_prepared_statements.py --iterations 5000
+"""
+import argparse
+import json
+import time
+
+import bench_util  # noqa: F401  (puts src/ on sys.path)
+from bench_util import percentile
+
+import psycopg
+
+from config import get_db_access
+from icecream_db import Icecream_SQL
+
+QUERIES = {
+    "by_ids": (Icecream_SQL.SELECT_BY_IDS, [["1", "2", "3"]]),
+    "by_names": (Icecream_SQL.SELECT_BY_NAMES, [["vanilla", "Blue Moon"]]),
+    "by_ids_or_names": (Icecream_SQL.SELECT_BY_IDS_OR_NAMES, [["1"], ["vanilla"]]),
+    "by_id": (Icecream_SQL.SELECT_BY_ID, [1]),
+}
+
+
+def time_query(cnx: psycopg.Connection, sql: str, params: list, iterations: int, prepare: bool) -> dict:
+    latencies = []
+    for _ in range(iterations):
+        _start = time.perf_counter()
+        cnx.execute(sql, params, prepare=prepare).fetchall()
+        latencies.append(time.perf_counter() - _start)
+    latencies.sort()
+    return {
+        "mean_us": round(sum(latencies) / len(latencies) * 1e6, 1),
+        "p50_us": round(percentile(latencies, 50) * 1e6, 1),
+        "p99_us": round(percentile(latencies, 99) * 1e6, 1),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+
+    results = {}
+    with psycopg.connect(get_db_access().conninfo, autocommit=True) as cnx:
+        for label, (sql, params) in QUERIES.items():
+            unprepared = time_query(cnx, sql, params, args.iterations, prepare=False)
+            prepared = time_query(cnx, sql, params, args.iterations, prepare=True)
+            results[label] = {
+                "unprepared": unprepared,
+                "prepared": prepared,
+                "p50_reduction_pct": round(100 * (1 - prepared["p50_us"] / unprepared["p50_us"]), 1),
+            }
+
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,84 @@
+"""Microbenchmark of Row2Icecreams against the previous validating mapper.
+
+No database is needed: rows are synthesized in the shape psycopg returns
+them, with ``Price`` as the money text the old query produced and as the
+float8 the current query produces.
+
+Usage::
+
+    python benchmarks/bench_row_mapping.py --sizes 1000 10000 100000
+"""
+import argparse
+import json
+import timeit
+
+import bench_util  # noqa: F401  (puts src/ on sys.path)
+
+from icecream import IceCream
+from icecream_db import Row2Icecreams
+
+COLUMN_MAP = {"ID": 0, "Name": 1, "Price": 2, "Quantity": 3, "OnDisplay": 4, "Description": 5}
+
+
+def legacy_row2icecreams(column_map, rows):
+    """Row2Icecreams as it was before the trusted-source fast path."""
+    _icecreams = []
+    for row in rows:
+        _icecream = IceCream(
+            Id=int(row[column_map["ID"]]),
+            Name=row[column_map["Name"]],
+            Price=float(row[column_map["Price"]][1:] if row[column_map["Price"]][0] == "$" else row[column_map["Price"]]),
+            Quantity=int(row[column_map["Quantity"]]),
+            OnDisplay=bool(row[column_map["OnDisplay"]]),
+            Description=row[column_map["Description"]] if row[column_map["Description"]] else '(no description yet)'
+        )
+        _icecreams.append(_icecream)
+
+    return _icecreams
+
+
+def make_rows(count: int, money_text: bool) -> list[tuple]:
+    return [
+        (
+            i,
+            f"flavor {i}",
+            f"${i % 9 + 1}.25" if money_text else float(i % 9 + 1) + 0.25,
+            i % 200 + 1,
+            i % 3 != 0,
+            "A reasonably long description of a frozen dessert." if i % 5 else None,
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def best_of(func, repeat: int) -> float:
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        money_rows = make_rows(size, money_text=True)
+        float_rows = make_rows(size, money_text=False)
+        assert legacy_row2icecreams(COLUMN_MAP, money_rows) == Row2Icecreams(COLUMN_MAP, float_rows)
+
+        legacy = best_of(lambda: legacy_row2icecreams(COLUMN_MAP, money_rows), args.repeat)
+        fast = best_of(lambda: Row2Icecreams(COLUMN_MAP, float_rows), args.repeat)
+        results.append({
+            "rows": size,
+            "legacy_ms": round(legacy * 1000, 2),
+            "fast_ms": round(fast * 1000, 2),
+            "speedup": round(legacy / fast, 2),
+        })
+
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,106 @@
+"""Shared helpers for the benchmark scripts.
+
+The benchmarks talk to a real Postgres configured through the same
+``ICECREAM_DB_*`` environment variables used by ``src/config.py``.
+"""
+import asyncio
+import os
+from collections import Counter
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import httpx
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+SRC_DIR = REPO_ROOT / "src"
+BENCH_DIR = REPO_ROOT / "benchmarks"
+
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def summarize(latencies: list[float], elapsed: float, errors: int = 0) -> dict:
+    """Summarizes latencies (seconds) into milliseconds and requests per second."""
+    _sorted = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(_sorted, 50) * 1000, 3),
+        "p95_ms": round(percentile(_sorted, 95) * 1000, 3),
+        "p99_ms": round(percentile(_sorted, 99) * 1000, 3),
+        "max_ms": round(_sorted[-1] * 1000, 3) if _sorted else 0.0,
+    }
+
+
+async def drive(base_url: str, make_request, concurrency: int, total: int) -> dict:
+    """Runs ``total`` requests spread over ``concurrency`` closed-loop clients.
+
+    :param make_request: ``async (client, i) -> httpx.Response``
+    """
+    latencies = []
+    errors = 0
+    statuses = Counter()
+    counter = iter(range(total))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+
+        async def _client():
+            nonlocal errors
+            for i in counter:
+                _start = time.perf_counter()
+                try:
+                    _resp = await make_request(client, i)
+                    statuses[_resp.status_code] += 1
+                    if _resp.status_code >= 500:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - _start)
+
+        _start = time.perf_counter()
+        await asyncio.gather(*[_client() for _ in range(concurrency)])
+        elapsed = time.perf_counter() - _start
+
+    return {**summarize(latencies, elapsed, errors), "statuses": {str(x): statuses[x] for x in sorted(statuses)}}
+
+
+@contextmanager
+def serve(app_ref: str, port: int, app_dir: Path = SRC_DIR, extra_env: dict | None = None):
+    """Runs ``uvicorn <app_ref>`` in a child process until the block exits."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([str(SRC_DIR), str(BENCH_DIR), env.get("PYTHONPATH", "")])
+    env.update(extra_env or {})
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app_ref, "--app-dir", str(app_dir),
+         "--port", str(port), "--log-level", "warning", "--no-access-log"],
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        _deadline = time.monotonic() + 30
+        while True:
+            try:
+                if httpx.get(f"{base_url}/", timeout=1).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if proc.poll() is not None or time.monotonic() > _deadline:
+                raise RuntimeError(f"uvicorn {app_ref} did not start")
+            time.sleep(0.1)
+        yield base_url
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
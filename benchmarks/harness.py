@@ -0,0 +1,353 @@
+"""Reproducible load test of the app against a throwaway Postgres.
+
+Starts a temporary Postgres cluster (with the ``pgserver`` package when
+installed, otherwise ``initdb``/``pg_ctl`` from PATH), creates the baseline
+``public."Icecream"`` table from ``benchmarks/schema.sql``, applies
+``migrations/`` and seeds ``--rows`` ice creams. It then runs the app under
+uvicorn and drives each scenario at ``--concurrency`` closed-loop clients,
+writing RPS and p50/p95/p99 latencies per scenario to a JSON file.
+
+Traces are replayed with ``--trace``: a JSONL file with one request per line,
+``{"method": "GET", "path": "/icecream?id=1"}``, optionally with ``"json"``
+(request body) and ``"headers"``. ``--compare`` prints the change against a
+previous results file, e.g. one written at another commit.
+
+Usage::
+
+    python benchmarks/harness.py --rows 10000 --concurrency 50 --requests 5000 \\
+        --output bench.json --compare baseline.json
+    python benchmarks/harness.py --scenarios get_by_id get_item --env ICECREAM_CACHE_MAX_SIZE=0
+    python benchmarks/harness.py --trace benchmarks/traces/sample.jsonl
+
+``--external`` uses the database configured by the ``ICECREAM_DB_*``
+variables instead of a throwaway one. Its schema is left alone unless
+``--reseed`` (which also truncates and seeds the table) or ``--migrate`` is
+given. The write scenarios still change existing rows (``patch_item``,
+``put_item``, ``sell``), but ``delete_item`` only deletes the ice creams
+that ``post`` created in the same run.
+"""
+import argparse
+import asyncio
+import collections
+import datetime
+import itertools
+import json
+import random
+import shutil
+import socket
+import subprocess
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+import bench_util  # noqa: F401  (puts src/ on sys.path)
+from bench_util import BENCH_DIR, REPO_ROOT, drive, serve
+
+import psycopg
+import psycopg.conninfo
+
+from migrate import MIGRATIONS_DIR, migrate
+
+SCHEMA_FILE = BENCH_DIR / "schema.sql"
+
+DB_NAME = "icecream"
+DB_USER = "icecream"
+DB_PASS = "icecream-bench"
+
+DESCRIPTION = "A reasonably long description of a frozen dessert, with notes of vanilla and caramel."
+
+
+def _free_port() -> int:
+    with socket.socket() as _sock:
+        _sock.bind(("127.0.0.1", 0))
+        return _sock.getsockname()[1]
+
+
+def _bootstrap(admin_conninfo: str) -> dict:
+    """Creates the bench role and database; returns the ICECREAM_DB_* settings."""
+    with psycopg.connect(admin_conninfo, autocommit=True) as cnx:
+        cnx.execute(f"CREATE ROLE {DB_USER} LOGIN SUPERUSER PASSWORD '{DB_PASS}'")
+        cnx.execute(f"CREATE DATABASE {DB_NAME} OWNER {DB_USER}")
+    _params = psycopg.conninfo.conninfo_to_dict(admin_conninfo)
+    return {
+        "ICECREAM_DB_HOST": _params.get("host", "localhost"),
+        "ICECREAM_DB_PORT": str(_params.get("port", 5432)),
+        "ICECREAM_DB_NAME": DB_NAME,
+        "ICECREAM_DB_USER": DB_USER,
+        "ICECREAM_DB_PWD": DB_PASS,
+    }
+
+
+@contextmanager
+def throwaway_postgres():
+    """Runs a temporary Postgres cluster; yields its ICECREAM_DB_* settings."""
+    datadir = Path(tempfile.mkdtemp(prefix="icecream-bench-"))
+    try:
+        try:
+            import pgserver
+        except ImportError:
+            pgserver = None
+
+        if pgserver is not None:
+            server = pgserver.get_server(datadir, cleanup_mode="stop")
+            try:
+                yield _bootstrap(server.get_uri())
+            finally:
+                server.cleanup()
+            return
+
+        if shutil.which("initdb") is None or shutil.which("pg_ctl") is None:
+            raise RuntimeError("Needs the pgserver package, or initdb and pg_ctl on PATH")
+
+        pgdata = datadir / "data"
+        port = _free_port()
+        subprocess.run(
+            ["initdb", "-D", str(pgdata), "-U", "postgres", "--auth=trust"], check=True, capture_output=True
+        )
+        subprocess.run(
+            ["pg_ctl", "-D", str(pgdata), "-l", str(datadir / "postgres.log"), "-w",
+             "-o", f"-p {port} -k {datadir} -c listen_addresses=''", "start"],
+            check=True,
+            capture_output=True,
+        )
+        try:
+            yield _bootstrap(psycopg.conninfo.make_conninfo(host=str(datadir), port=port, dbname="postgres", user="postgres"))
+        finally:
+            subprocess.run(["pg_ctl", "-D", str(pgdata), "-m", "fast", "-w", "stop"], capture_output=True)
+    finally:
+        shutil.rmtree(datadir, ignore_errors=True)
+
+
+def _conninfo(db_env: dict) -> str:
+    return psycopg.conninfo.make_conninfo(
+        host=db_env["ICECREAM_DB_HOST"],
+        port=db_env["ICECREAM_DB_PORT"],
+        dbname=db_env["ICECREAM_DB_NAME"],
+        user=db_env["ICECREAM_DB_USER"],
+        password=db_env["ICECREAM_DB_PWD"],
+    )
+
+
+def prepare_database(conninfo: str, rows: int, reseed: bool = True, create_schema: bool = True):
+    """Creates the schema, applies the migrations and seeds ``rows`` ice creams."""
+    if create_schema:
+        with psycopg.connect(conninfo, autocommit=True) as cnx:
+            cnx.execute(SCHEMA_FILE.read_text())
+
+        migrate(conninfo, migrations_dir=MIGRATIONS_DIR)
+
+    if not reseed:
+        return
+
+    with psycopg.connect(conninfo) as cnx:
+        cnx.execute('TRUNCATE public."Icecream" RESTART IDENTITY')
+        with cnx.cursor().copy(
+            'COPY public."Icecream" ("Name", "Price", "Quantity", "OnDisplay", "Description") FROM STDIN'
+        ) as copy:
+            for i in range(1, rows + 1):
+                copy.write_row((f"flavor {i}", f"{i % 9 + 1}.25", i % 200 + 1, i % 3 != 0, DESCRIPTION))
+        cnx.execute('ANALYZE public."Icecream"')
+
+
+def scenarios(rows: int, seed: int) -> dict:
+    """The scenarios by name: ``async (client, i) -> httpx.Response``.
+
+    ``delete_item`` removes the ice creams ``post`` created, by the ids its
+    responses returned, so it runs last. Once they are used up, it deletes
+    id 0, which never exists, rather than guessing ids of other rows.
+    """
+    rng = random.Random(seed)
+    run = rng.randrange(1 << 30)
+
+    post_numbers = itertools.count()
+    created_ids = collections.deque()
+
+    def _id() -> int:
+        return rng.randint(1, rows)
+
+    async def get_all(client, _i):
+        return await client.get("/icecream")
+
+    async def get_all_gzip(client, _i):
+        return await client.get("/icecream", headers={"Accept-Encoding": "gzip"})
+
+    async def get_by_id(client, _i):
+        return await client.get("/icecream", params={"id": _id()})
+
+    async def get_by_name(client, _i):
+        return await client.get("/icecream", params={"name": f"flavor {_id()}"})
+
+    async def get_page(client, _i):
+        return await client.get("/icecream", params={"limit": 100})
+
+    async def search(client, _i):
+        # Typeahead: a prefix of one to three keystrokes past "flavor ".
+        _prefix = str(_id())
+        return await client.get("/icecream/search", params={"q": f"flavor {_prefix[:rng.randint(1, 3)]}"})
+
+    async def get_item(client, _i):
+        return await client.get(f"/icecream/{_id()}")
+
+    async def post(client, _i):
+        _resp = await client.post(
+            "/icecream",
+            json={"Name": f"bench {run} {next(post_numbers)}", "Price": 2.5, "Quantity": 10, "Description": DESCRIPTION},
+        )
+        if _resp.status_code == 201:
+            created_ids.append(_resp.json()["Id"])
+        return _resp
+
+    async def patch_item(client, i):
+        return await client.patch(f"/icecream/{_id()}", json={"Quantity": i % 200 + 1})
+
+    async def sell(client, _i):
+        # A few hot flavors, as during a promotion; 409 once sold out.
+        return await client.post(f"/icecream/{rng.randint(1, 5)}/sell", json={"Quantity": 1})
+
+    async def put_item(client, i):
+        _icecream_id = _id()
+        return await client.put(
+            f"/icecream/{_icecream_id}",
+            json={
+                "Id": _icecream_id,
+                "Name": f"flavor {_icecream_id}",
+                "Price": 3.25,
+                "Quantity": i % 200 + 1,
+                "OnDisplay": True,
+                "Description": DESCRIPTION,
+            },
+        )
+
+    async def delete_item(client, _i):
+        return await client.delete(f"/icecream/{created_ids.popleft() if created_ids else 0}")
+
+    return {
+        "get_all": get_all,
+        "get_all_gzip": get_all_gzip,
+        "get_by_id": get_by_id,
+        "get_by_name": get_by_name,
+        "get_page": get_page,
+        "search": search,
+        "get_item": get_item,
+        "post": post,
+        "patch_item": patch_item,
+        "put_item": put_item,
+        "sell": sell,
+        "delete_item": delete_item,
+    }
+
+
+def load_trace(path: Path) -> list[dict]:
+    with open(path) as _file:
+        return [json.loads(line) for line in _file if line.strip()]
+
+
+def trace_replayer(trace: list[dict]):
+    async def _replay(client, i):
+        entry = trace[i % len(trace)]
+        return await client.request(
+            entry.get("method", "GET"), entry["path"], json=entry.get("json"), headers=entry.get("headers")
+        )
+
+    return _replay
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, check=True, capture_output=True, text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, baseline: dict) -> list[str]:
+    """One line per scenario with the RPS and p99 change against ``baseline``."""
+    lines = []
+    for name, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if previous is None:
+            continue
+        _rps = (current["rps"] / previous["rps"] - 1) * 100 if previous["rps"] else 0.0
+        _p99 = (current["p99_ms"] / previous["p99_ms"] - 1) * 100 if previous["p99_ms"] else 0.0
+        lines.append(f"{name:>16}: rps {previous['rps']:>9} -> {current['rps']:>9} ({_rps:+.1f}%), "
+                     f"p99 {previous['p99_ms']:>9} -> {current['p99_ms']:>9} ms ({_p99:+.1f}%)")
+    return lines
+
+
+def run(args, db_env: dict) -> dict:
+    conninfo = _conninfo(db_env)
+    prepare_database(
+        conninfo,
+        args.rows,
+        reseed=not args.external or args.reseed,
+        create_schema=not args.external or args.reseed or args.migrate,
+    )
+
+    workload = {}
+    available = scenarios(args.rows, args.seed)
+    for name in args.scenarios if args.scenarios is not None else ([] if args.trace else list(available)):
+        workload[name] = available[name]
+    for trace_path in args.trace or []:
+        workload[f"trace:{trace_path.name}"] = trace_replayer(load_trace(trace_path))
+
+    app_env = {**db_env, "APP_WORKERS": "1", **dict(x.split("=", 1) for x in args.env)}
+    results = {
+        "commit": _git_commit(),
+        "started_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "rows": args.rows,
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "env": dict(x.split("=", 1) for x in args.env),
+        "scenarios": {},
+    }
+    with serve("app:app", args.port, extra_env=app_env) as base_url:
+        for name, make_request in workload.items():
+            if args.warmup:
+                asyncio.run(drive(base_url, make_request, args.concurrency, args.warmup))
+            results["scenarios"][name] = asyncio.run(drive(base_url, make_request, args.concurrency, args.requests))
+            print(f"{name:>16}: {json.dumps(results['scenarios'][name])}")
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000, help="ice creams to seed")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=5000, help="requests per scenario")
+    parser.add_argument("--warmup", type=int, default=200, help="unmeasured requests before each scenario")
+    parser.add_argument("--scenarios", nargs="+", choices=list(scenarios(1, 0)), help="default: all")
+    parser.add_argument("--trace", type=Path, action="append", help="JSONL trace to replay (repeatable)")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="app setting (repeatable)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--port", type=int, default=10410)
+    parser.add_argument("--output", type=Path, help="write the results JSON here")
+    parser.add_argument("--compare", type=Path, help="results JSON of a previous run to compare with")
+    parser.add_argument("--external", action="store_true", help="use the ICECREAM_DB_* database")
+    parser.add_argument("--reseed", action="store_true", help="with --external, truncate and seed the table")
+    parser.add_argument("--migrate", action="store_true", help="with --external, create the schema and apply migrations")
+    args = parser.parse_args()
+
+    if args.external:
+        from config import get_settings
+
+        settings = get_settings()
+        db_env = {x: getattr(settings, x.lower()) for x in (
+            "ICECREAM_DB_HOST", "ICECREAM_DB_PORT", "ICECREAM_DB_NAME", "ICECREAM_DB_USER", "ICECREAM_DB_PWD")}
+        results = run(args, db_env)
+    else:
+        with throwaway_postgres() as db_env:
+            results = run(args, db_env)
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + "\n")
+    else:
+        print(json.dumps(results, indent=2))
+
+    if args.compare:
+        print("\n".join(compare(results, json.loads(args.compare.read_text()))))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,10 @@
+-- Baseline public."Icecream" table, as it exists before migrations/ are
+-- applied. Used by benchmarks/harness.py to build a throwaway database.
+CREATE TABLE IF NOT EXISTS public."Icecream" (
+    "ID" integer PRIMARY KEY,
+    "Name" varchar(60) NOT NULL,
+    "Price" money NOT NULL,
+    "Quantity" integer NOT NULL,
+    "OnDisplay" boolean NOT NULL,
+    "Description" varchar(600)
+);
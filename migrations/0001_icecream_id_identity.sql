@@ -0,0 +1,12 @@
+-- Allocate "ID" from an identity sequence instead of LOCK TABLE + MAX("ID").
+-- Existing rows keep their ids; the sequence continues after the current maximum.
+-- BY DEFAULT (rather than ALWAYS) still allows explicit ids, e.g. for restores.
+
+ALTER TABLE public."Icecream"
+    ALTER COLUMN "ID" ADD GENERATED BY DEFAULT AS IDENTITY;
+
+SELECT setval(
+    pg_get_serial_sequence('public."Icecream"', 'ID'),
+    COALESCE((SELECT MAX("ID") FROM public."Icecream"), 0) + 1,
+    false
+);
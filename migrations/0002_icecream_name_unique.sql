@@ -0,0 +1,9 @@
+-- migrate: no-transaction
+-- Unique index on "Name": single-row name lookups use it, and concurrent
+-- creates/renames can no longer produce two ice creams with the same name.
+-- Built CONCURRENTLY so that reads and writes continue during the build.
+-- Fails with the offending name if duplicates already exist; migrate.py then
+-- drops the INVALID index left behind before the next attempt.
+
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS "Icecream_Name_key"
+    ON public."Icecream" ("Name");
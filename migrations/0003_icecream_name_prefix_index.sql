@@ -0,0 +1,11 @@
+-- migrate: no-transaction
+-- Case-insensitive prefix index for GET /icecream/search: with the "C"
+-- collation, lower("Name") LIKE 'prefix%' is an index range scan, and the
+-- matches come out already ordered, so ORDER BY ... LIMIT stops early.
+-- Built CONCURRENTLY so that reads and writes continue during the build.
+-- If a build fails, migrate.py drops the INVALID index left behind before the
+-- next attempt, instead of letting IF NOT EXISTS keep it (and search fall back
+-- to sequential scans).
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "Icecream_Name_lower_prefix_idx"
+    ON public."Icecream" ((lower("Name") COLLATE "C"), "ID");
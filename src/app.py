@@ -1,13 +1,179 @@
 """Create Application."""
-from pathlib import Path
+import base64
+import json
+from contextlib import aclosing, asynccontextmanager
 
-from config import Pool
-from icecream_db import Icecream_DB
+from config import get_async_db_access, get_settings
+from icecream import Error
+from icecream_batcher import Icecream_Batcher
+from icecream_bulk import router as bulk_router
+from icecream_cache import Icecream_Cache
+from icecream_catalog import Icecream_Catalog
+from icecream_health import Readiness_Check
+from icecream_json import Icecream_JSONResponse, encode_icecreams, encode_icecreams_ndjson
+from icecream_logging import configure_logging
+from icecream_notify import Icecream_Change_Listener
+from icecream_operations import router as operations_router
+from icecream_sell import sell_coalescer
+from metrics import PROMETHEUS_MEDIA_TYPE, Metrics_Middleware, registry
+from read_your_writes import read_your_writes
+from response_compression import Compression_Middleware, available_encodings, encoded_etag, negotiate
+from singleflight import Single_Flight
 
 from fastapi import FastAPI, status, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import Response, StreamingResponse
 
-app = FastAPI()
+settings = get_settings()
+async_db_access = get_async_db_access()
+
+configure_logging(settings.app_log_level, settings.app_log_sample_rate)
+
+compression_encodings = available_encodings(settings.app_compression_encodings)
+cache = Icecream_Cache(max_size=settings.icecream_cache_max_size, ttl=settings.icecream_cache_ttl)
+single_flight = Single_Flight() if settings.icecream_single_flight else None
+batcher = (
+    Icecream_Batcher(db_access=async_db_access, window_ms=settings.icecream_batch_window_ms, max_keys=settings.icecream_batch_max_keys)
+    if settings.icecream_batch_window_ms > 0
+    else None
+)
+catalog = Icecream_Catalog(
+    db_access=async_db_access,
+    cache=cache,
+    concurrent_lookups=settings.icecream_concurrent_lookups,
+    snapshot_max_age=settings.icecream_snapshot_max_age,
+    single_flight=single_flight,
+    batcher=batcher,
+    precompressed_encodings=compression_encodings,
+    precompress_min_size=settings.app_compression_min_size,
+    primary_window=settings.icecream_read_your_writes_seconds if async_db_access.has_readers else 0.0,
+    search_in_process=settings.icecream_search_in_process,
+)
+readiness = Readiness_Check(
+    db_access=async_db_access,
+    db_check_interval=settings.app_ready_db_check_interval,
+    db_check_timeout=settings.app_ready_db_check_timeout,
+    max_waiting=settings.app_ready_max_waiting,
+)
+change_listener = Icecream_Change_Listener(conninfo=async_db_access.conninfo)
+change_listener.subscribe(cache.clear)
+change_listener.subscribe(catalog.invalidate_snapshot)
+if single_flight is not None:
+    change_listener.subscribe(single_flight.forget)
+if batcher is not None:
+    change_listener.subscribe(batcher.forget)
+
+
+def _pool_gauges() -> dict:
+    _stats = async_db_access.stats()
+    return {
+        "icecream_db_pool_size": ("Connections open in this worker's pool.", _stats.get("pool_size", 0)),
+        "icecream_db_pool_available": ("Idle connections in the pool.", _stats.get("pool_available", 0)),
+        "icecream_db_pool_requests_waiting": ("Requests queued for a connection.", _stats.get("requests_waiting", 0)),
+    }
+
+
+registry.add_collector(_pool_gauges)
+
+
+# Query parameters that change how results are delivered rather than which
+# ice creams are selected.
+_CONTROL_PARAMS = {"stream", "limit", "after"}
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def _wants_stream(_req: Request, control_params: dict) -> str | None:
+    """Media type to stream the catalog in, or None for a buffered response."""
+    if NDJSON_MEDIA_TYPE in _req.headers.get("accept", ""):
+        return NDJSON_MEDIA_TYPE
+    if control_params.get("stream", ["false"])[-1].lower() in ("1", "true", "yes"):
+        return "application/json"
+    return None
+
+
+async def _stream_catalog(media_type: str, primary: bool = False):
+    """Encodes the catalog batch by batch, as NDJSON lines or as one JSON array."""
+    async with aclosing(catalog.stream_all(batch_size=settings.icecream_stream_batch_size, primary=primary)) as batches:
+        if media_type == NDJSON_MEDIA_TYPE:
+            async for batch in batches:
+                yield encode_icecreams_ndjson(batch)
+            return
+
+        separator = b"["
+        async for batch in batches:
+            yield separator + encode_icecreams(batch)[1:-1]
+            separator = b","
+        yield b"[]" if separator == b"[" else b"]"
+
+
+def _encode_page_cursor(last_id: int) -> str:
+    """Opaque `after` cursor that resumes the listing past ``last_id``."""
+    return base64.urlsafe_b64encode(json.dumps({"id": last_id}).encode()).decode().rstrip("=")
+
+
+def _decode_page_cursor(cursor: str) -> int:
+    """Inverse of `_encode_page_cursor`; raises ValueError for malformed cursors."""
+    try:
+        _padded = cursor + "=" * (-len(cursor) % 4)
+        return int(json.loads(base64.urlsafe_b64decode(_padded))["id"])
+    except Exception as _err:
+        raise ValueError(f"Invalid cursor {cursor!r}") from _err
+
+
+def _page_params(control_params: dict) -> tuple[int, int] | None:
+    """``(after_id, limit)`` when pagination was requested, otherwise None."""
+    if "limit" not in control_params and "after" not in control_params:
+        return None
+
+    limit = settings.icecream_page_default_limit
+    if "limit" in control_params:
+        try:
+            limit = int(control_params["limit"][-1])
+        except ValueError:
+            raise ValueError(f"limit must be an integer, got {control_params['limit'][-1]!r}")
+        if not 0 < limit <= settings.icecream_page_max_limit:
+            raise ValueError(f"limit must be between 1 and {settings.icecream_page_max_limit}")
+
+    after_id = _decode_page_cursor(control_params["after"][-1]) if "after" in control_params else 0
+    return (after_id, limit)
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against ``etag``."""
+    if not if_none_match:
+        return False
+    for _tag in if_none_match.split(","):
+        _tag = _tag.strip()
+        if _tag == "*" or _tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    """Creates and opens this worker's connection pool at startup and closes it on shutdown.
+
+    Invalid settings stop the worker here, rather than when modules are imported.
+    """
+    problems = settings.problems()
+    if problems:
+        raise RuntimeError(f"Invalid configuration: {'; '.join(problems)}")
+    async_db_access.SetupConnectionPool()
+    await async_db_access.open(wait=True, timeout=settings.icecream_db_pool_warmup_timeout)
+    change_listener.start()
+    readiness.drain_on_sigterm(settings.app_drain_seconds)
+    try:
+        yield
+    finally:
+        await change_listener.stop()
+        await async_db_access.close()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=Icecream_JSONResponse)
+if compression_encodings:
+    app.add_middleware(Compression_Middleware, minimum_size=settings.app_compression_min_size, encodings=compression_encodings)
+# Added last, so it is outermost and its timings include compression.
+app.add_middleware(Metrics_Middleware)
 
 
 @app.get("/")
@@ -17,17 +183,120 @@ async def home():
     :return: 'Welcome to Icecream' hearbeat string
     """
     _r = {"message": "Welcome to your icecream cart! We offer thousands of flavors."}
-    return JSONResponse(content=_r)
+    return Icecream_JSONResponse(content=_r)
 
 
 @app.get("/health")
+@app.get("/health/live")
 async def healthcheck():
-    """System healthcheck
+    """Liveness: the worker's event loop is serving requests.
+
+    Doesn't touch the database, so a database outage doesn't get healthy
+    workers restarted; use `/health/ready` to route traffic.
 
     :return: 'Welcome to Icecream' hearbeat string
     """
     _health = {"health": "OK"}
-    return JSONResponse(content=_health)
+    return Icecream_JSONResponse(content=_health)
+
+
+@app.get("/health/ready")
+async def readinesscheck():
+    """Readiness: whether this worker should receive traffic.
+
+    503 while the database check fails (`SELECT 1`, cached for
+    APP_READY_DB_CHECK_INTERVAL seconds), while more than
+    APP_READY_MAX_WAITING requests wait for a pool connection, or with reason
+    `draining` once the worker got SIGTERM (it keeps serving for
+    APP_DRAIN_SECONDS before shutting down). Cheap enough to probe every second.
+
+    :return: readiness, the reasons when not ready, database and pool state
+    """
+    ready, details = await readiness.check()
+    return Icecream_JSONResponse(
+        content=details, status_code=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE
+    )
+
+
+@app.get("/pool/stats")
+async def poolstats():
+    """Connection pool counters of this worker (psycopg_pool `get_stats()`).
+
+    Includes requests_waiting, requests_wait_ms, requests_errors,
+    connections_in_use and the configured min_size/max_size.
+
+    :return: pool statistics
+    """
+    return Icecream_JSONResponse(content=async_db_access.stats())
+
+
+@app.get("/metrics")
+async def metrics():
+    """Latency histograms and pool gauges of this worker, in the Prometheus text format.
+
+    Covers request handling per route, and in the data layer the pool
+    acquire wait, statement execution, row mapping and JSON encoding.
+
+    :return: Prometheus exposition text
+    """
+    return Response(content=registry.render(), media_type=PROMETHEUS_MEDIA_TYPE)
+
+
+@app.get("/cache/stats")
+async def cachestats():
+    """Catalog cache counters, used to size ICECREAM_CACHE_MAX_SIZE and ICECREAM_CACHE_TTL.
+
+    `single_flight` counts the database calls started and the requests that
+    joined one already in flight; `batcher` the batched lookup queries and
+    the keys they resolved; `sell_coalescer` the sale batches and the sales
+    they applied.
+
+    :return: size, hit, miss, eviction, expiration and invalidation counters
+    """
+    _stats = cache.stats()
+    if single_flight is not None:
+        _stats["single_flight"] = single_flight.stats()
+    if batcher is not None:
+        _stats["batcher"] = batcher.stats()
+    if sell_coalescer is not None:
+        _stats["sell_coalescer"] = sell_coalescer.stats()
+    return Icecream_JSONResponse(content=_stats)
+
+
+@app.get("/icecream/search", status_code=status.HTTP_200_OK)
+async def searchicecreams(_req: Request):
+    """Ice creams whose name starts with `q`, ignoring case, for typeahead.
+
+    At most `limit` results, ordered by name; uses the name prefix index
+    (migration 0003), or the in-process index of the catalog snapshot
+    while it is current.
+
+    :return: list of matching ice creams
+    """
+    try:
+        prefix = _req.query_params.get("q", "").strip()
+        if not prefix:
+            error = Error(ErrorMessage="Unable to process the request. q must not be empty", ErrorKey="INVALID_SEARCH")
+            return Icecream_JSONResponse(content=error, status_code=status.HTTP_400_BAD_REQUEST)
+
+        limit = settings.icecream_search_default_limit
+        if "limit" in _req.query_params:
+            try:
+                limit = int(_req.query_params["limit"])
+            except ValueError:
+                limit = 0
+            if not 0 < limit <= settings.icecream_search_max_limit:
+                error = Error(
+                    ErrorMessage=f"Unable to process the request. limit must be between 1 and {settings.icecream_search_max_limit}",
+                    ErrorKey="INVALID_SEARCH",
+                )
+                return Icecream_JSONResponse(content=error, status_code=status.HTTP_400_BAD_REQUEST)
+
+        results = await catalog.search(prefix, limit, primary=read_your_writes.wants_primary(_req))
+        return Icecream_JSONResponse(content=results)
+    except Exception as _err:
+        error = Error(ErrorMessage=f"Sorry, unable to process the request. {str(_err)}", ErrorKey="GENERIC_ERROR")
+        return Icecream_JSONResponse(content=error, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
 @app.get("/icecream", status_code=status.HTTP_200_OK)
@@ -43,9 +312,25 @@ async def geticecreams(_req: Request):
     If `name` and `id` query parameters are provided the result is
     the union of both searches.
 
+    The unfiltered catalog is served from a pre-encoded snapshot with a
+    strong `ETag`; a matching `If-None-Match` gets `304 Not Modified`.
+    With `Accept: application/x-ndjson` (one ice cream per line) or
+    `stream=true` (a chunked JSON array) it is instead streamed from a
+    server-side cursor, so memory use doesn't grow with the catalog.
+    The snapshot is precompressed per `Accept-Encoding` (zstd, br, gzip),
+    each variant with its own `ETag`.
+
+    `limit` and `after` page through the catalog ordered by id instead;
+    the response is then `{"Items": [...], "Next": cursor}`, where `Next`
+    is the `after` value for the following page, or null on the last one.
+
+    Clients that just wrote (see `read_your_writes`) read from the
+    primary database rather than a replica, bypassing the caches.
+
     :return: list of matching ice creams
     """
     try:
+        primary = read_your_writes.wants_primary(_req)
         qry_params_list = _req.query_params._list
         qry_params_dict_ci = {}
         for _key, _value in qry_params_list:
@@ -54,26 +339,56 @@ async def geticecreams(_req: Request):
                 qry_params_dict_ci[_key_ci] = []
             qry_params_dict_ci[_key_ci].append(_value)
 
+        control_params = {}
+        for _key in _CONTROL_PARAMS & qry_params_dict_ci.keys():
+            control_params[_key] = qry_params_dict_ci.pop(_key)
+
+        try:
+            page_params = _page_params(control_params)
+        except ValueError as _err:
+            error = Error(ErrorMessage=f"Unable to process the request. {str(_err)}", ErrorKey="INVALID_PAGINATION")
+            return Icecream_JSONResponse(content=error, status_code=status.HTTP_400_BAD_REQUEST)
+
         requested_ids = qry_params_dict_ci.get("id")
 
         requested_names = qry_params_dict_ci.get("name")
 
         if qry_params_dict_ci:
-            results = set()
-            if requested_ids is not None:
-                _results = Icecream_DB.get_icecream_by_ids(pool=Pool, ids=requested_ids)
-                results.update(_results)
+            results = await catalog.get_by_ids_or_names(ids=requested_ids, names=requested_names, primary=primary)
+            return Icecream_JSONResponse(content=results)
 
-            if requested_names is not None:
-                _results = Icecream_DB.get_icecream_by_names(pool=Pool, names=requested_names)
-                results.update(_results)
+        if page_params is not None:
+            _icecreams, has_more = await catalog.get_page(*page_params, primary=primary)
+            next_cursor = _encode_page_cursor(_icecreams[-1].Id) if has_more else None
+            return Icecream_JSONResponse(content={"Items": _icecreams, "Next": next_cursor})
 
-            return JSONResponse(content=[x.__dict__ for x in results])
+        stream_media_type = _wants_stream(_req, control_params)
+        if stream_media_type is not None:
+            return StreamingResponse(_stream_catalog(stream_media_type, primary), media_type=stream_media_type)
 
-        _icecream_rows = Icecream_DB.get_all_icecream(pool=Pool)
-        return JSONResponse(content=[x.__dict__ for x in _icecream_rows])
+        if primary:
+            return Response(content=encode_icecreams(await catalog.get_all(primary=True)), media_type="application/json")
+
+        snapshot = await catalog.get_snapshot()
+        encoding = negotiate(_req.headers.get("accept-encoding", ""), compression_encodings)
+        content_encoding, etag, body = snapshot.variant(encoding)
+        _headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        if_none_match = _req.headers.get("if-none-match")
+        if content_encoding is None and encoding is not None and _etag_matches(if_none_match, encoded_etag(etag, encoding)):
+            # Not precompressed yet: Compression_Middleware sent it compressed, with this ETag.
+            _headers["ETag"] = encoded_etag(etag, encoding)
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=_headers)
+        if _etag_matches(if_none_match, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=_headers)
+        if content_encoding is not None:
+            _headers["Content-Encoding"] = content_encoding
+        return Response(content=body, media_type="application/json", headers=_headers)
     except Exception as _err:
-        return JSONResponse(
-            content=_err.__dict__, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
+        error = Error(ErrorMessage=f"Sorry, unable to process the request. {str(_err)}", ErrorKey="GENERIC_ERROR")
+        return Icecream_JSONResponse(content=error, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 
+# Included last so that the fixed /icecream/... paths above take precedence
+# over /icecream/{req_id}.
+app.include_router(bulk_router)
+app.include_router(operations_router)
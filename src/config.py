@@ -1,26 +1,239 @@
-from os import getenv
-
-from dbaccess import DB_Access
-
-ICECREAM_DB_HOST = getenv('ICECREAM_DB_HOST', '192.168.1.95')
-ICECREAM_DB_PORT = getenv('ICECREAM_DB_PORT', '5432')
-ICECREAM_DB_NAME = getenv('ICECREAM_DB_NAME', 'icecream')
-ICECREAM_DB_USER = getenv('ICECREAM_DB_USER', 'icecream')
-ICECREAM_DB_PWD = getenv('ICECREAM_DB_PWD', 'ABCdef123!')
-
-# default port is 10301 if APP_PORT is not defined
-APP_PORT = getenv('APP_PORT', 10301)
-
-# Validate DB info
-icecream_vars = [ICECREAM_DB_HOST, ICECREAM_DB_PORT, ICECREAM_DB_NAME, ICECREAM_DB_USER, ICECREAM_DB_PWD]
-if not all(icecream_vars):
-    raise Exception("One or more database environment variables are missing.")
-
-db_access = DB_Access(
-    db_host=ICECREAM_DB_HOST,
-    db_port=ICECREAM_DB_PORT,
-    db_name=ICECREAM_DB_NAME,
-    db_user=ICECREAM_DB_USER,
-    db_pass=ICECREAM_DB_PWD
-)
-Pool = db_access.ConnectionPool
\ No newline at end of file
+"""Service settings, read once from the environment into a typed ``Settings``.
+
+Importing this module is cheap and never fails: nothing touches the
+database, and psycopg (through ``dbaccess``) is only imported when the
+database access objects are first requested. Missing or malformed values
+are reported by ``Settings.problems()``, which the application lifespan
+checks before opening the pool.
+"""
+
+import os
+from dataclasses import dataclass, field, fields
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from dbaccess import DB_Access, AsyncDB_Access
+
+_DB_SETTINGS = ('icecream_db_host', 'icecream_db_port', 'icecream_db_name', 'icecream_db_user', 'icecream_db_pwd')
+
+
+def _parse(kind, value: str):
+    if kind is bool:
+        return value.strip().lower() in ('1', 'true', 'yes')
+    if kind == tuple[str, ...]:
+        return tuple(x.strip() for x in value.split(',') if x.strip())
+    if kind == int | None:
+        return None if value.strip().lower() == 'none' else int(value)
+    return kind(value)
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Every setting, named after its environment variable in lower case."""
+
+    icecream_db_host: str = '192.168.1.95'
+    icecream_db_port: str = '5432'
+    icecream_db_name: str = 'icecream'
+    icecream_db_user: str = 'icecream'
+    icecream_db_pwd: str = field(default='ABCdef123!', repr=False)
+
+    # Read replicas, as comma-separated host or host:port entries using the
+    # credentials above. Catalog reads are spread over them per
+    # ICECREAM_DB_READER_POLICY (round_robin or least_busy); writes always go to
+    # ICECREAM_DB_HOST.
+    icecream_db_reader_hosts: tuple[str, ...] = ()
+    icecream_db_reader_policy: str = 'round_robin'
+
+    # Seconds after a write during which reads go to the primary: for the client
+    # that wrote (tracked with a cookie), and for the cache and snapshot refills
+    # after a change notification, so replica lag can't put stale rows back in
+    # the cache. 0 disables.
+    icecream_read_your_writes_seconds: float = 5.0
+
+    app_port: int = 10301
+
+    # Server worker processes (default, 0: one per CPU) and how long each one
+    # may spend draining in-flight requests after SIGTERM.
+    app_workers: int = 0
+    app_graceful_shutdown_timeout: float = 30.0
+    # Seconds a worker keeps serving after SIGTERM, with /health/ready reporting
+    # "draining", before it stops accepting connections; cover the load
+    # balancer's readiness probe interval times its failure threshold.
+    app_drain_seconds: float = 0.0
+
+    # Service log level, and the fraction of DEBUG/INFO records kept (warnings
+    # and errors are always logged).
+    app_log_level: str = 'INFO'
+    app_log_sample_rate: float = 1.0
+
+    # Connections this deployment may hold, shared by all workers; keep it below
+    # the server's max_connections. Each worker also keeps one connection for
+    # change notifications, so its pool gets the rest of its share.
+    # ICECREAM_DB_POOL_MAX_SIZE overrides that share.
+    icecream_db_max_connections: int = 90
+    icecream_db_pool_max_size: int = 0
+    icecream_db_pool_min_size: int = 2
+
+    # Connection pool behaviour, in seconds: how long a request may wait for a
+    # connection, when connections are recycled or closed while idle, and how
+    # long startup waits for the first min_size connections. A max waiting of 0
+    # queues without limit. ICECREAM_DB_POOL_CHECK tests connections on checkout,
+    # at the cost of a round trip per request; off by default, since max_idle,
+    # max_lifetime and the error path already retire broken connections.
+    icecream_db_pool_timeout: float = 30.0
+    icecream_db_pool_max_lifetime: float = 3600.0
+    icecream_db_pool_max_idle: float = 600.0
+    icecream_db_pool_max_waiting: int = 0
+    icecream_db_pool_check: bool = False
+    icecream_db_pool_warmup_timeout: float = 30.0
+
+    # Executions after which psycopg prepares other statements server-side on
+    # each connection (psycopg's default is 5). The fixed catalog queries
+    # (icecream_db.Icecream_SQL) are prepared on first use regardless. "none"
+    # disables prepared statements altogether, e.g. behind PgBouncer in
+    # transaction pooling mode.
+    icecream_db_prepare_threshold: int | None = 5
+
+    # Readiness (/health/ready): how often, in seconds, the database is checked
+    # with SELECT 1 and how long that check may take, and how many requests may
+    # queue for a pool connection before the worker reports itself saturated
+    # (default: the pool's max size; 0 disables the saturation check).
+    app_ready_db_check_interval: float = 5.0
+    app_ready_db_check_timeout: float = 1.0
+    app_ready_max_waiting: int | None = None
+
+    # When both `id` and `name` are queried, run the two lookups concurrently on
+    # separate connections instead of as one combined statement.
+    icecream_concurrent_lookups: bool = False
+
+    # Let concurrent identical catalog queries share one in-flight database call.
+    icecream_single_flight: bool = True
+
+    # Micro-batching of id/name lookups: keys arriving within the window (in
+    # milliseconds) are resolved by one ANY() query per kind, dispatched early
+    # once max keys are pending. A window of 0 disables batching.
+    icecream_batch_window_ms: float = 1.0
+    icecream_batch_max_keys: int = 500
+
+    # POST /icecream/{id}/sell: sales of the same ice cream arriving within the
+    # window (in milliseconds) share one row lock and UPDATE, so that a hot
+    # flavor doesn't serialize every checkout. A window of 0 (the default)
+    # applies each sale on its own.
+    icecream_sell_coalesce_ms: float = 0.0
+
+    # Response compression: the encodings offered, in preference order (brotli
+    # and zstd need the optional brotli/zstandard packages), and the smallest
+    # body in bytes worth compressing. An empty list disables compression.
+    app_compression_encodings: tuple[str, ...] = ('zstd', 'br', 'gzip')
+    app_compression_min_size: int = 1024
+
+    # In-process catalog cache; a max size of 0 disables it. Entries are also
+    # dropped whenever Postgres notifies a catalog change.
+    icecream_cache_max_size: int = 10000
+    icecream_cache_ttl: float = 300.0
+
+    # Upper bound on the age of the pre-encoded full-catalog snapshot, in case a
+    # change was made without a notification (e.g. by hand in psql).
+    icecream_snapshot_max_age: float = 300.0
+
+    # Rows fetched per server-side cursor round-trip when streaming the catalog.
+    icecream_stream_batch_size: int = 1000
+
+    # Page size used when only `after` is given, and the largest `limit` accepted.
+    icecream_page_default_limit: int = 100
+    icecream_page_max_limit: int = 1000
+
+    # GET /icecream/search: results returned when no `limit` is given, and the
+    # largest `limit` accepted. With ICECREAM_SEARCH_IN_PROCESS, searches are
+    # answered from an index kept with the full-catalog snapshot while it is
+    # current, without a database round-trip.
+    icecream_search_default_limit: int = 10
+    icecream_search_max_limit: int = 100
+    icecream_search_in_process: bool = True
+
+    # Largest number of ice creams accepted by POST /icecream/bulk.
+    icecream_bulk_max_items: int = 10000
+
+    # Environment variables that could not be parsed; their defaults are used.
+    errors: tuple[str, ...] = field(default=(), compare=False)
+
+    def __post_init__(self):
+        # Derived defaults; the dataclass is frozen once built.
+        workers = self.app_workers or os.cpu_count() or 1
+        pool_max_size = self.icecream_db_pool_max_size or max(1, self.icecream_db_max_connections // workers - 1)
+        object.__setattr__(self, 'app_workers', workers)
+        object.__setattr__(self, 'icecream_db_pool_max_size', pool_max_size)
+        object.__setattr__(self, 'icecream_db_pool_min_size', min(self.icecream_db_pool_min_size, pool_max_size))
+        if self.app_ready_max_waiting is None:
+            object.__setattr__(self, 'app_ready_max_waiting', pool_max_size)
+
+    @classmethod
+    def from_env(cls, environ=os.environ) -> 'Settings':
+        """Settings from ``environ``; values that don't parse keep their default and are listed in ``errors``."""
+        values = {}
+        errors = []
+        for _field in fields(cls):
+            name = _field.name.upper()
+            if _field.name == 'errors' or name not in environ:
+                continue
+            try:
+                values[_field.name] = _parse(_field.type, environ[name])
+            except ValueError:
+                errors.append(f"{name}={environ[name]!r} is not a valid {getattr(_field.type, '__name__', _field.type)}")
+        return cls(**values, errors=tuple(errors))
+
+    def problems(self) -> list[str]:
+        """What prevents the service from starting: malformed values and empty database settings."""
+        missing = [x.upper() for x in _DB_SETTINGS if not getattr(self, x)]
+        if missing:
+            return [*self.errors, f"Database settings missing: {', '.join(missing)}"]
+        return list(self.errors)
+
+    @property
+    def db_pool_options(self) -> dict:
+        return {
+            'name': 'icecream',
+            'min_size': self.icecream_db_pool_min_size,
+            'max_size': self.icecream_db_pool_max_size,
+            'timeout': self.icecream_db_pool_timeout,
+            'max_lifetime': self.icecream_db_pool_max_lifetime,
+            'max_idle': self.icecream_db_pool_max_idle,
+            'max_waiting': self.icecream_db_pool_max_waiting,
+            'check': self.icecream_db_pool_check,
+            'kwargs': {'prepare_threshold': self.icecream_db_prepare_threshold},
+        }
+
+    @property
+    def db_access_options(self) -> dict:
+        return {
+            'db_host': self.icecream_db_host,
+            'db_port': self.icecream_db_port,
+            'db_name': self.icecream_db_name,
+            'db_user': self.icecream_db_user,
+            'db_pass': self.icecream_db_pwd,
+            'pool_options': self.db_pool_options,
+            'reader_hosts': list(self.icecream_db_reader_hosts),
+            'reader_policy': self.icecream_db_reader_policy,
+        }
+
+
+@lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    return Settings.from_env()
+
+
+# Pools are created lazily in each worker process (the async one by the
+# application lifespan), never when these objects are built.
+@lru_cache(maxsize=None)
+def get_db_access() -> 'DB_Access':
+    from dbaccess import DB_Access
+
+    return DB_Access(**get_settings().db_access_options)
+
+
+@lru_cache(maxsize=None)
+def get_async_db_access() -> 'AsyncDB_Access':
+    from dbaccess import AsyncDB_Access
+
+    return AsyncDB_Access(**get_settings().db_access_options)
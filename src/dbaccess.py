@@ -1,11 +1,61 @@
+import itertools
+
 import psycopg.conninfo
 from psycopg_pool import ConnectionPool, AsyncConnectionPool
 import psycopg
 
 
+def _pool_stats(pool) -> dict:
+    """``pool.get_stats()`` plus the configured bounds and connections in use."""
+    if pool is None:
+        return {}
+    stats = pool.get_stats()
+    stats["min_size"] = pool.min_size
+    stats["max_size"] = pool.max_size
+    stats["connections_in_use"] = stats.get("pool_size", 0) - stats.get("pool_available", 0)
+    return stats
+
+
+def _reader_conninfos(reader_hosts: list[str], db_port: int, db_name: str, db_user: str, db_pass: str) -> list[str]:
+    """Conninfo per ``host`` or ``host:port`` in ``reader_hosts``, with the writer's credentials."""
+    conninfos = []
+    for reader in reader_hosts:
+        host, separator, port = reader.rpartition(":")
+        if not separator or not port.isdigit():
+            host, port = reader, ""
+        conninfos.append(psycopg.conninfo.make_conninfo(
+            host=host, port=port or db_port, dbname=db_name, user=db_user, password=db_pass))
+    return conninfos
+
+
+def _pick_reader(pools: list, policy: str, turn: itertools.count):
+    """Reader pool by ``policy``: "least_busy" (fewest connections in use plus waiting) or "round_robin"."""
+    if len(pools) == 1:
+        return pools[0]
+    if policy == "least_busy":
+        def _busy(pool):
+            stats = pool.get_stats()
+            return stats.get("pool_size", 0) - stats.get("pool_available", 0) + stats.get("requests_waiting", 0)
+        return min(pools, key=_busy)
+    return pools[next(turn) % len(pools)]
+
+
+def _reader_pool_options(options: dict, i: int) -> dict:
+    return {**options, "name": f"{options.get('name', 'pool')}-reader-{i}"}
+
+
 class DB_Access:
+    """Connection pools for the primary (writer) and, optionally, read replicas.
+
+    ``reader_hosts`` lists the replicas as ``host`` or ``host:port``; each
+    gets its own pool with the same options. ``ConnectionPool`` is always
+    the writer; ``ReaderPool`` picks a replica by ``reader_policy``
+    ("round_robin" or "least_busy"), or is the writer when there are none.
+    """
+
     def __init__(
-        self, db_host: str, db_port: int, db_name: str, db_user: str, db_pass: str
+        self, db_host: str, db_port: int, db_name: str, db_user: str, db_pass: str, pool_options: dict | None = None,
+        reader_hosts: list[str] | None = None, reader_policy: str = "round_robin"
     ):
         self.db_host = db_host
         self.db_port = db_port
@@ -13,19 +63,35 @@ class DB_Access:
         self.db_user = db_user
         self.db_pass = db_pass
         self.pool = None
+        self.reader_pools = []
+        self.pool_options = pool_options or {}
+        self.reader_policy = reader_policy
+        self._reader_turn = itertools.count()
         self.conninfo = psycopg.conninfo.make_conninfo(
             host=self.db_host, 
             port=self.db_port, 
             dbname=self.db_name, 
             user=self.db_user, 
             password=self.db_pass)
+        self.reader_conninfos = _reader_conninfos(reader_hosts or [], db_port, db_name, db_user, db_pass)
 
-    def SetupConnectionPool(self, min_size: int = 2, max_size: int = 15):
+    def SetupConnectionPool(self, **pool_options):
+        """Creates the pool from ``pool_options`` over the constructor's ``pool_options``.
+
+        Accepts the psycopg_pool keyword arguments (min_size, max_size,
+        timeout, max_lifetime, max_idle, max_waiting, ...); ``check=True``
+        enables the pool's connection health check on checkout.
+        """
+        options = {"min_size": 2, "max_size": 15, **self.pool_options, **pool_options}
+        if options.pop("check", False):
+            options["check"] = ConnectionPool.check_connection
 
         self.pool = ConnectionPool(
             self.conninfo,
-            min_size=min_size, 
-            max_size=max_size)
+            **options)
+        self.reader_pools = [
+            ConnectionPool(x, **_reader_pool_options(options, i)) for i, x in enumerate(self.reader_conninfos)
+        ]
 
     
     @property
@@ -34,10 +100,32 @@ class DB_Access:
             self.SetupConnectionPool()
 
         return self.pool
+
+    @property
+    def has_readers(self) -> bool:
+        return bool(self.reader_conninfos)
+
+    @property
+    def ReaderPool(self):
+        if self.pool is None:
+            self.SetupConnectionPool()
+        if not self.reader_pools:
+            return self.pool
+
+        return _pick_reader(self.reader_pools, self.reader_policy, self._reader_turn)
+
+    def stats(self) -> dict:
+        stats = _pool_stats(self.pool)
+        if self.reader_pools:
+            stats["readers"] = [_pool_stats(x) for x in self.reader_pools]
+        return stats
     
 class AsyncDB_Access:
+    """Async counterpart of ``DB_Access``, including its read replica pools."""
+
     def __init__(
-        self, db_host: str, db_port: int, db_name: str, db_user: str, db_pass: str
+        self, db_host: str, db_port: int, db_name: str, db_user: str, db_pass: str, pool_options: dict | None = None,
+        reader_hosts: list[str] | None = None, reader_policy: str = "round_robin"
     ):
         self.db_host = db_host
         self.db_port = db_port
@@ -45,20 +133,32 @@ class AsyncDB_Access:
         self.db_user = db_user
         self.db_pass = db_pass
         self.pool = None
+        self.reader_pools = []
+        self.pool_options = pool_options or {}
+        self.reader_policy = reader_policy
+        self._reader_turn = itertools.count()
         self.conninfo = psycopg.conninfo.make_conninfo(
             host=self.db_host, 
             port=self.db_port, 
             dbname=self.db_name, 
             user=self.db_user, 
             password=self.db_pass)
+        self.reader_conninfos = _reader_conninfos(reader_hosts or [], db_port, db_name, db_user, db_pass)
 
-    def SetupConnectionPool(self, min_size: int = 1, max_size: int = 3):
+    def SetupConnectionPool(self, **pool_options):
+        """Async counterpart of ``DB_Access.SetupConnectionPool``; the pool is opened by ``open``."""
+        options = {"min_size": 1, "max_size": 3, **self.pool_options, **pool_options}
+        if options.pop("check", False):
+            options["check"] = AsyncConnectionPool.check_connection
 
         self.pool = AsyncConnectionPool(
             self.conninfo,
-            min_size=min_size, 
-            max_size=max_size,
-            open=False)
+            open=False,
+            **options)
+        self.reader_pools = [
+            AsyncConnectionPool(x, open=False, **_reader_pool_options(options, i))
+            for i, x in enumerate(self.reader_conninfos)
+        ]
 
     
     @property
@@ -67,4 +167,39 @@ class AsyncDB_Access:
             self.SetupConnectionPool()
 
         return self.pool
-    
+
+    @property
+    def has_readers(self) -> bool:
+        return bool(self.reader_conninfos)
+
+    @property
+    def ReaderPool(self):
+        if self.pool is None:
+            self.SetupConnectionPool()
+        if not self.reader_pools:
+            return self.pool
+
+        return _pick_reader(self.reader_pools, self.reader_policy, self._reader_turn)
+
+    async def open(self, wait: bool = True, timeout: float = 30.0):
+        """Opens the pool; called once at application startup, not per query.
+
+        With ``wait`` this returns only once ``min_size`` connections are
+        established (or raises after ``timeout``), so the first requests don't
+        pay the connect latency.
+        """
+        await self.ConnectionPool.open(wait=wait, timeout=timeout)
+        for pool in self.reader_pools:
+            await pool.open(wait=wait, timeout=timeout)
+
+    async def close(self):
+        for pool in self.reader_pools:
+            await pool.close()
+        if self.pool is not None:
+            await self.pool.close()
+
+    def stats(self) -> dict:
+        stats = _pool_stats(self.pool)
+        if self.reader_pools:
+            stats["readers"] = [_pool_stats(x) for x in self.reader_pools]
+        return stats
@@ -46,24 +46,75 @@ class IceCream(BaseModel):
     def __hash__(self):
         return self.Id
 
-    def tojson(self):
-        """Performs the json conversion of the input ice cream object.
 
-        :return: object in json format
-        """
-        jsonstr = "".join(
-            [
-                "{",
-                f'"Id":{self.Id}, ',
-                f'"Name":"{self.Name}", ',
-                f'"Price":{self.Price}, ',
-                f'"Description":"{self.Description}", ',
-                f'"Quantity":{self.Quantity}',
-                "}",
-            ]
-        )
+# Shown for ice creams stored without a description.
+NO_DESCRIPTION = "(no description yet)"
+
+_ICECREAM_FIELDS_SET = set(IceCream.model_fields)
+_new_icecream = IceCream.__new__
+_set_attr = object.__setattr__
+
+
+def assemble_icecream(fields: dict) -> IceCream:
+    """An ``IceCream`` with ``fields`` as its attributes, skipping validation.
+
+    For values read from our own table: the instance is assembled directly
+    (as ``model_construct`` does, minus its per-field bookkeeping), so
+    ``fields`` must hold every field, in declaration order, already typed.
+    That is several times faster than ``model_construct``, and than
+    validating. It relies on pydantic's instance layout, which
+    tests/test_assemble_icecream.py pins.
+    """
+    _icecream = _new_icecream(IceCream)
+    _set_attr(_icecream, "__dict__", fields)
+    # Its own set: pydantic updates it in place on attribute assignment.
+    _set_attr(_icecream, "__pydantic_fields_set__", _ICECREAM_FIELDS_SET.copy())
+    _set_attr(_icecream, "__pydantic_extra__", None)
+    _set_attr(_icecream, "__pydantic_private__", None)
+    return _icecream
+
+
+class CreateIceCreamParams(BaseModel):
+    """Parameters for a new ice cream; the Id is assigned by the database."""
+
+    Name: str = Field(max_length=60)
+    Price: float = Field(
+        gt=0.0, description="The price must be a number greater than zero"
+    )
+    Quantity: int = Field(
+        gt=0, description="The quantity must be an integer greater than zero"
+    )
+    OnDisplay: bool = True
+    Description: str = Field(max_length=600)
+
+
+class PatchIceCreamParams(BaseModel):
+    """Partial update of an ice cream; fields left as None are unchanged."""
+
+    Name: str | None = Field(default=None, max_length=60)
+    Price: float | None = Field(
+        default=None, gt=0.0, description="The price must be a number greater than zero"
+    )
+    Quantity: int | None = Field(
+        default=None, gt=0, description="The quantity must be an integer greater than zero"
+    )
+    OnDisplay: bool | None = None
+    Description: str | None = Field(default=None, max_length=600)
+
+
+class SellIceCreamParams(BaseModel):
+    """Quantity of an ice cream sold, taken off its stock."""
+
+    Quantity: int = Field(
+        gt=0, description="The quantity must be an integer greater than zero"
+    )
+
+
+class Error(BaseModel):
+    """Error body returned by the API."""
 
-        return jsonstr
+    ErrorMessage: str
+    ErrorKey: str
 
 
 if __name__ == "__main__":
@@ -75,6 +126,6 @@ if __name__ == "__main__":
             Quantity=100,
             Description="Vanilla Bean Ice Cream: Speck-tacular Flavor!",
         )
-        print(ic1.tojson())
+        print(ic1.model_dump_json())
     except ValidationError as e:
         print(e)
@@ -0,0 +1,147 @@
+"""Micro-batching of ice cream point lookups into one ``ANY()`` query per kind."""
+
+import asyncio
+
+from dbaccess import AsyncDB_Access
+from icecream import IceCream
+from icecream_db import AsyncIcecream_DB
+
+
+class Icecream_Batcher:
+    """Dataloader-style batcher for lookups by id and by name.
+
+    Keys requested by concurrent callers are collected for up to
+    ``window_ms`` milliseconds, or until ``max_keys`` are pending, then
+    resolved with a single ``async_get_icecream_by_ids`` or
+    ``async_get_icecream_by_names`` call. Each caller receives the ice cream
+    for each of its keys, or None where there is none. A key whose query is
+    already in flight joins it instead of being queued again.
+    """
+
+    def __init__(self, db_access: AsyncDB_Access, window_ms: float = 1.0, max_keys: int = 500):
+        self.db_access = db_access
+        self.window = window_ms / 1000
+        self.max_keys = max_keys
+        self.batches = 0
+        self.keys = 0
+        self.largest_batch = 0
+        self.joined = 0
+        self._loaders = {
+            "id": AsyncIcecream_DB.async_get_icecream_by_ids,
+            "name": AsyncIcecream_DB.async_get_icecream_by_names,
+        }
+        self._pending: dict[str, dict] = {"id": {}, "name": {}}
+        self._in_flight: dict[str, dict] = {"id": {}, "name": {}}
+        self._timers: dict[str, asyncio.TimerHandle | None] = {"id": None, "name": None}
+        self._running: set[asyncio.Task] = set()
+
+    async def load_ids(self, ids: list[str]) -> list[IceCream | None]:
+        """The ice cream for each of ``ids``; ids that aren't integers match nothing."""
+        keys = []
+        for _id in ids:
+            try:
+                keys.append(int(_id))
+            except (TypeError, ValueError):
+                keys.append(None)
+        return await self._load("id", keys)
+
+    async def load_names(self, names: list[str]) -> list[IceCream | None]:
+        """The ice cream for each of ``names``."""
+        return await self._load("name", names)
+
+    async def _load(self, kind: str, keys: list) -> list[IceCream | None]:
+        loop = asyncio.get_running_loop()
+        pending = self._pending[kind]
+        in_flight = self._in_flight[kind]
+        futures = []
+        for key in keys:
+            if key is None:
+                futures.append(None)
+                continue
+            future = in_flight.get(key)
+            if future is not None:
+                self.joined += 1
+                futures.append(future)
+                continue
+            future = pending.get(key)
+            if future is None:
+                future = loop.create_future()
+                pending[key] = future
+            futures.append(future)
+            if len(pending) >= self.max_keys:
+                self._dispatch(kind)
+                pending = self._pending[kind]
+
+        if pending and self._timers[kind] is None:
+            self._timers[kind] = loop.call_later(self.window, self._dispatch, kind)
+
+        # Shielded: the futures are shared, one caller being cancelled must
+        # not cancel them for the others.
+        return list(
+            await asyncio.gather(*(asyncio.shield(x) if x is not None else _none() for x in futures))
+        )
+
+    def _dispatch(self, kind: str):
+        """Starts the query for the keys pending for ``kind``."""
+        timer = self._timers[kind]
+        if timer is not None:
+            timer.cancel()
+            self._timers[kind] = None
+
+        batch = self._pending[kind]
+        if not batch:
+            return
+        self._pending[kind] = {}
+        self._in_flight[kind].update(batch)
+
+        self.batches += 1
+        self.keys += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        task = asyncio.ensure_future(self._resolve(kind, batch))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _resolve(self, kind: str, batch: dict):
+        in_flight = self._in_flight[kind]
+        try:
+            _icecreams = await self._loaders[kind](self.db_access.ReaderPool, list(batch))
+        except Exception as _err:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(_err)
+            return
+        finally:
+            for key, future in batch.items():
+                if in_flight.get(key) is future:
+                    del in_flight[key]
+
+        if kind == "id":
+            found = {x.Id: x for x in _icecreams}
+        else:
+            found = {x.Name: x for x in _icecreams}
+        for key, future in batch.items():
+            if not future.done():
+                future.set_result(found.get(key))
+
+    def forget(self, _payload: str | None = None):
+        """Detaches the queries in flight, so later lookups start new ones.
+
+        Used as the change-notification callback: a lookup arriving after a
+        change must not join a query that started before it.
+        """
+        for kind in self._in_flight:
+            self._in_flight[kind] = {}
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "keys": self.keys,
+            "joined": self.joined,
+            "largest_batch": self.largest_batch,
+            "window_ms": self.window * 1000,
+            "max_keys": self.max_keys,
+        }
+
+
+async def _none():
+    return None
@@ -0,0 +1,134 @@
+"""Bulk creation of ice creams."""
+
+import json
+
+from fastapi import APIRouter, Request, status
+from pydantic import ValidationError
+
+from config import get_async_db_access, get_settings
+from icecream import CreateIceCreamParams, Error, IceCream
+from icecream_db import AsyncIcecream_DB
+from icecream_json import Icecream_JSONResponse
+from read_your_writes import read_your_writes
+
+router = APIRouter()
+
+settings = get_settings()
+async_db_access = get_async_db_access()
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def _parse_items(body: bytes, content_type: str) -> list:
+    """Items of a JSON array body, or of an NDJSON body (one object per line)."""
+    if NDJSON_MEDIA_TYPE in content_type:
+        return [json.loads(line) for line in body.splitlines() if line.strip()]
+
+    items = json.loads(body)
+    if not isinstance(items, list):
+        raise ValueError("Expected a JSON array of ice creams")
+    return items
+
+
+def _item_error(index: int, status_code: int, error_key: str, error_message: str) -> dict:
+    return {"Index": index, "Status": status_code, "ErrorMessage": error_message, "ErrorKey": error_key}
+
+
+def _existing_result(index: int, createparam: CreateIceCreamParams, existing: IceCream) -> dict:
+    """200 with ``existing`` when it is identical to ``createparam``, 409 otherwise."""
+    if (
+        existing.Price == createparam.Price
+        and existing.Quantity == createparam.Quantity
+        and existing.OnDisplay == createparam.OnDisplay
+        and existing.Description == createparam.Description
+    ):
+        return {"Index": index, "Status": status.HTTP_200_OK, "Icecream": existing}
+    return _duplicate_error(index, createparam.Name)
+
+
+def _duplicate_error(index: int, name: str) -> dict:
+    return _item_error(
+        index,
+        status.HTTP_409_CONFLICT,
+        "DUPLICATE_ICECREAM",
+        f"Unable to process the request. Icecream with same name {name} exist",
+    )
+
+
+@router.post("/icecream/bulk", status_code=status.HTTP_200_OK)
+async def createicecreams_bulk(_req: Request):
+    """Creates many ice creams in one request and one transaction.
+
+    The body is a JSON array, or NDJSON with `Content-Type: application/x-ndjson`,
+    of `CreateIceCreamParams` objects. Each item gets its own result, in
+    request order: 201 with the created ice cream, 200 with the existing one
+    when an identical ice cream already exists, 409 when the name is taken
+    (or repeated earlier in the request), or 422 when the item is invalid.
+
+    :return: list of per-item results
+    """
+    try:
+        items = _parse_items(await _req.body(), _req.headers.get("content-type", ""))
+    except ValueError as _err:
+        error = Error(ErrorMessage=f"Unable to process the request. {str(_err)}", ErrorKey="INVALID_BODY")
+        return Icecream_JSONResponse(content=error, status_code=status.HTTP_400_BAD_REQUEST)
+
+    if len(items) > settings.icecream_bulk_max_items:
+        error = Error(
+            ErrorMessage=f"Unable to process the request. At most {settings.icecream_bulk_max_items} ice creams per request",
+            ErrorKey="TOO_MANY_ICECREAMS",
+        )
+        return Icecream_JSONResponse(content=error, status_code=status.HTTP_413_CONTENT_TOO_LARGE)
+
+    try:
+        results = [None] * len(items)
+        valid = {}
+        for i, item in enumerate(items):
+            try:
+                valid[i] = CreateIceCreamParams.model_validate(item)
+            except ValidationError as _err:
+                _message = "; ".join(f"{'.'.join(map(str, x['loc']))}: {x['msg']}" for x in _err.errors())
+                results[i] = _item_error(i, status.HTTP_422_UNPROCESSABLE_CONTENT, "INVALID_ICECREAM", _message)
+
+        pool = async_db_access.ConnectionPool
+        existing = {}
+        if valid:
+            _names = list({x.Name for x in valid.values()})
+            existing = {x.Name: x for x in await AsyncIcecream_DB.async_get_icecream_by_names(pool=pool, names=_names)}
+
+        to_insert = []
+        seen_names = set()
+        for i, createparam in valid.items():
+            _existing = existing.get(createparam.Name)
+            if _existing is not None:
+                results[i] = _existing_result(i, createparam, _existing)
+            elif createparam.Name in seen_names:
+                results[i] = _duplicate_error(i, createparam.Name)
+            else:
+                seen_names.add(createparam.Name)
+                to_insert.append((i, createparam))
+
+        created = await AsyncIcecream_DB.async_bulk_insert_icecreams(pool=pool, icecreams=[x for _, x in to_insert])
+        lost = []
+        for (i, createparam), icecream in zip(to_insert, created):
+            if icecream is None:
+                lost.append((i, createparam))
+            else:
+                results[i] = {"Index": i, "Status": status.HTTP_201_CREATED, "Icecream": icecream}
+
+        if lost:
+            # Names created concurrently since the check above.
+            _names = [x.Name for _, x in lost]
+            existing = {x.Name: x for x in await AsyncIcecream_DB.async_get_icecream_by_names(pool=pool, names=_names)}
+            for i, createparam in lost:
+                _existing = existing.get(createparam.Name)
+                if _existing is not None:
+                    results[i] = _existing_result(i, createparam, _existing)
+                else:
+                    results[i] = _duplicate_error(i, createparam.Name)
+
+        response = Icecream_JSONResponse(content=results)
+        return read_your_writes.mark_write(response) if any(created) else response
+    except Exception as _err:
+        error = Error(ErrorMessage=f"Sorry, unable to process the request. {str(_err)}", ErrorKey="GENERIC_ERROR")
+        return Icecream_JSONResponse(content=error, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
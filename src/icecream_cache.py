@@ -0,0 +1,80 @@
+"""Bounded LRU cache with TTL for ice cream point lookups."""
+
+import time
+from collections import OrderedDict
+from typing import Any
+
+
+class Icecream_Cache:
+    """In-process read-through cache keyed by ``("id", ...)`` and ``("name", ...)``.
+
+    Entries expire after ``ttl`` seconds and the least recently used entry is
+    evicted once ``max_size`` is reached. A cached ``None`` records that the
+    key does not exist, so repeated misses don't reach the database either.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 300.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self._entries: OrderedDict = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def get(self, key: tuple) -> tuple[bool, Any]:
+        """Returns ``(hit, value)`` for ``key``."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return (False, None)
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return (False, None)
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return (True, value)
+
+    def put(self, key: tuple, value: Any, generation: int | None = None):
+        """Stores ``value``, unless the cache was invalidated after ``generation``.
+
+        Callers pass the generation they read before querying the database, so
+        results fetched before an invalidation can't repopulate the cache.
+        """
+        if not self.enabled or (generation is not None and generation != self.generation):
+            return
+
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self, _payload: str | None = None):
+        """Drops every entry; used as the change-notification callback."""
+        self._entries.clear()
+        self.generation += 1
+        self.invalidations += 1
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
@@ -0,0 +1,303 @@
+"""Read path for the ice cream catalog, layered in front of AsyncIcecream_DB."""
+
+import asyncio
+import hashlib
+import time
+from contextlib import aclosing
+from dataclasses import dataclass, field, replace
+
+from dbaccess import AsyncDB_Access
+from icecream import IceCream
+from icecream_batcher import Icecream_Batcher
+from icecream_cache import Icecream_Cache
+from icecream_db import AsyncIcecream_DB
+from icecream_search import Name_Prefix_Index
+from icecream_store import Icecream_Store
+from response_compression import compress_variants, encoded_etag
+from singleflight import Single_Flight
+
+
+def _id_key(_id: str) -> str:
+    """Normalizes a requested id so that `7` and `07` share a cache entry."""
+    try:
+        return str(int(_id))
+    except (TypeError, ValueError):
+        return str(_id)
+
+
+@dataclass(frozen=True)
+class Catalog_Snapshot:
+    """The full catalog, pre-encoded as the GET /icecream response body.
+
+    ``store`` holds the ice creams themselves in columnar form, ``variants``
+    the body precompressed per content encoding, and ``name_index`` the
+    ice creams indexed for name prefix search.
+    """
+
+    version: int
+    generation: int
+    built_at: float
+    etag: str
+    body: bytes
+    store: Icecream_Store
+    variants: dict[str, bytes] = field(default_factory=dict)
+    name_index: Name_Prefix_Index | None = None
+
+    def variant(self, encoding: str | None) -> tuple[str | None, str, bytes]:
+        """``(content_encoding, etag, body)`` for ``encoding``, falling back to identity.
+
+        Each variant has its own strong ETag, since the bytes differ.
+        """
+        if encoding in self.variants:
+            return (encoding, encoded_etag(self.etag, encoding), self.variants[encoding])
+        return (None, self.etag, self.body)
+
+
+class Icecream_Catalog:
+    """Serves catalog reads from ``Icecream_Cache``, falling back to the database.
+
+    The full catalog is kept as a ``Catalog_Snapshot`` that is rebuilt only
+    after a change notification, or once it is older than ``snapshot_max_age``.
+
+    Database reads go through ``single_flight`` when given: concurrent
+    requests for the same (normalized) ids and names, page or full catalog
+    share one query instead of each taking a pool connection. With a
+    ``batcher``, the id and name lookups of different requests are further
+    merged into one ``ANY()`` query per kind.
+
+    Each snapshot is also compressed once with ``precompressed_encodings``
+    (when at least ``precompress_min_size`` bytes), so serving it compressed
+    costs no CPU per request. That happens in a background task after the
+    snapshot is published; until it finishes, the snapshot is served as
+    identity (or with the previous variants, if the content is unchanged).
+
+    Reads go to ``db_access.ReaderPool`` (a read replica, when configured).
+    Only the cache and snapshot refills during the ``primary_window``
+    seconds after a change notification go to the primary, so that a
+    lagging replica can't put the old rows back for everyone. Callers pass
+    ``primary=True`` for clients that must read their own writes; those
+    reads also bypass the cache.
+
+    While the snapshot is current, id and name lookups are answered from
+    its ``Icecream_Store``. With ``search_in_process``, each snapshot also
+    carries a ``Name_Prefix_Index``, and name searches are answered from it
+    instead of querying the database.
+    """
+
+    def __init__(
+        self,
+        db_access: AsyncDB_Access,
+        cache: Icecream_Cache,
+        concurrent_lookups: bool = False,
+        snapshot_max_age: float = 300.0,
+        single_flight: Single_Flight | None = None,
+        batcher: Icecream_Batcher | None = None,
+        precompressed_encodings: tuple[str, ...] = (),
+        precompress_min_size: int = 1024,
+        primary_window: float = 0.0,
+        search_in_process: bool = False,
+    ):
+        self.db_access = db_access
+        self.cache = cache
+        self.concurrent_lookups = concurrent_lookups
+        self.snapshot_max_age = snapshot_max_age
+        self.single_flight = single_flight
+        self.batcher = batcher
+        self.precompressed_encodings = precompressed_encodings
+        self.precompress_min_size = precompress_min_size
+        self.primary_window = primary_window
+        self.search_in_process = search_in_process
+        self._changed_at = float("-inf")
+        self._snapshot: Catalog_Snapshot | None = None
+        self._snapshot_generation = 0
+        self._snapshot_lock = asyncio.Lock()
+        self._compress_task: asyncio.Task | None = None
+
+    def _recently_changed(self) -> bool:
+        return time.monotonic() - self._changed_at < self.primary_window
+
+    def _read_pool(self, primary: bool):
+        return self.db_access.ConnectionPool if primary else self.db_access.ReaderPool
+
+    async def _coalesced(self, key: tuple, fn, *args, **kwargs):
+        if self.single_flight is None:
+            return await fn(*args, **kwargs)
+        return await self.single_flight.do(key, fn, *args, **kwargs)
+
+    async def _lookup(self, ids: list[str], names: list[str], primary: bool) -> list[IceCream]:
+        key = ("ids_or_names", frozenset(_id_key(_id) for _id in ids), frozenset(names), primary)
+        if self.batcher is not None and not primary:
+            return await self._coalesced(key, self._batched_lookup, ids, names)
+        return await self._coalesced(
+            key,
+            AsyncIcecream_DB.async_get_icecream_by_ids_or_names,
+            pool=self._read_pool(primary),
+            ids=ids,
+            names=names,
+            concurrent=self.concurrent_lookups,
+        )
+
+    async def _batched_lookup(self, ids: list[str], names: list[str]) -> list[IceCream]:
+        by_id, by_name = await asyncio.gather(self.batcher.load_ids(ids), self.batcher.load_names(names))
+        results = {}
+        for _icecream in by_id + by_name:
+            if _icecream is not None:
+                results[_icecream.Id] = _icecream
+        return list(results.values())
+
+    async def get_by_ids_or_names(
+        self, ids: list[str] | None, names: list[str] | None, primary: bool = False
+    ) -> list[IceCream]:
+        """Union of the ice creams matching ``ids`` or ``names``."""
+        ids = ids or []
+        names = names or []
+        if not primary and self._snapshot_is_current():
+            return self._snapshot.store.lookup(ids, names)
+        if primary or not self.cache.enabled:
+            return await self._lookup(ids, names, primary)
+
+        results = {}
+        missing_ids = []
+        missing_names = []
+        for _id in ids:
+            hit, _icecream = self.cache.get(("id", _id_key(_id)))
+            if not hit:
+                missing_ids.append(_id)
+            elif _icecream is not None:
+                results[_icecream.Id] = _icecream
+
+        for _name in names:
+            hit, _icecream = self.cache.get(("name", _name))
+            if not hit:
+                missing_names.append(_name)
+            elif _icecream is not None:
+                results[_icecream.Id] = _icecream
+
+        if missing_ids or missing_names:
+            generation = self.cache.generation
+            _rows = await self._lookup(missing_ids, missing_names, self._recently_changed())
+            by_id = {str(x.Id): x for x in _rows}
+            by_name = {x.Name: x for x in _rows}
+            for _id in missing_ids:
+                _key = _id_key(_id)
+                self.cache.put(("id", _key), by_id.get(_key), generation)
+            for _name in missing_names:
+                self.cache.put(("name", _name), by_name.get(_name), generation)
+            for _icecream in _rows:
+                results[_icecream.Id] = _icecream
+
+        return list(results.values())
+
+    async def get_all(self, primary: bool = False) -> list[IceCream]:
+        return await self._coalesced(
+            ("all", primary), AsyncIcecream_DB.async_get_all_icecreams, pool=self._read_pool(primary)
+        )
+
+    async def get_page(self, after_id: int, limit: int, primary: bool = False) -> tuple[list[IceCream], bool]:
+        """Up to ``limit`` ice creams after ``after_id``, and whether more follow."""
+        _icecreams = await self._coalesced(
+            ("page", after_id, limit, primary),
+            AsyncIcecream_DB.async_get_icecream_page,
+            pool=self._read_pool(primary),
+            after_id=after_id,
+            limit=limit + 1,
+        )
+        return (_icecreams[:limit], len(_icecreams) > limit)
+
+    async def stream_all(self, batch_size: int = 1000, primary: bool = False):
+        """Yields the full catalog in batches straight from the database."""
+        pool = self._read_pool(primary)
+        async with aclosing(AsyncIcecream_DB.async_stream_all_icecreams(pool=pool, batch_size=batch_size)) as batches:
+            async for batch in batches:
+                yield batch
+
+    def invalidate_snapshot(self, _payload: str | None = None):
+        """Marks the snapshot stale; used as the change-notification callback."""
+        self._snapshot_generation += 1
+        self._changed_at = time.monotonic()
+
+    def _snapshot_is_current(self) -> bool:
+        return (
+            self._snapshot is not None
+            and self._snapshot.generation == self._snapshot_generation
+            and time.monotonic() - self._snapshot.built_at < self.snapshot_max_age
+        )
+
+    async def get_snapshot(self) -> Catalog_Snapshot:
+        """Current full-catalog snapshot; concurrent callers share one rebuild."""
+        if self._snapshot_is_current():
+            return self._snapshot
+
+        async with self._snapshot_lock:
+            if self._snapshot_is_current():
+                return self._snapshot
+
+            generation = self._snapshot_generation
+            # Only a rebuild triggered by a change notification is a refill.
+            primary = self._recently_changed() and (
+                self._snapshot is None or self._snapshot.generation != generation
+            )
+            store = await self._coalesced(
+                ("store", primary), AsyncIcecream_DB.async_get_icecream_store, pool=self._read_pool(primary)
+            )
+            body = await asyncio.to_thread(store.to_json)
+            etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+            previous = self._snapshot
+            variants = {}
+            name_index = None
+            if previous is not None and previous.etag == etag:
+                version = previous.version
+                variants = previous.variants
+                name_index = previous.name_index
+                # Same content: keep the store the index points into.
+                store = previous.store
+            else:
+                version = previous.version + 1 if previous is not None else 1
+            if self.search_in_process and name_index is None:
+                name_index = await asyncio.to_thread(Name_Prefix_Index, store)
+
+            self._snapshot = Catalog_Snapshot(
+                version=version,
+                generation=generation,
+                built_at=time.monotonic(),
+                etag=etag,
+                body=body,
+                store=store,
+                variants=variants,
+                name_index=name_index,
+            )
+            if not variants and self.precompressed_encodings and len(body) >= self.precompress_min_size:
+                self._start_compression()
+            return self._snapshot
+
+    def _start_compression(self):
+        if self._compress_task is None or self._compress_task.done():
+            self._compress_task = asyncio.create_task(self._compress_snapshot())
+
+    async def _compress_snapshot(self):
+        """Precompresses the current snapshot, and again if it was replaced in the meantime."""
+        while True:
+            snapshot = self._snapshot
+            if snapshot.variants or len(snapshot.body) < self.precompress_min_size:
+                return
+            variants = await asyncio.to_thread(compress_variants, snapshot.body, self.precompressed_encodings)
+            if self._snapshot.etag == snapshot.etag:
+                self._snapshot = replace(self._snapshot, variants=variants)
+
+    async def search(self, prefix: str, limit: int, primary: bool = False) -> list[IceCream]:
+        """Up to ``limit`` ice creams whose name starts with ``prefix`` (case-insensitive), by name.
+
+        Served from the current snapshot's ``name_index`` when there is one;
+        a search never triggers a snapshot rebuild by itself.
+        """
+        snapshot = self._snapshot
+        if not primary and self._snapshot_is_current() and snapshot.name_index is not None:
+            return snapshot.name_index.search(prefix, limit)
+
+        return await self._coalesced(
+            ("search", prefix.lower(), limit, primary),
+            AsyncIcecream_DB.async_search_icecreams_by_name_prefix,
+            pool=self._read_pool(primary),
+            prefix=prefix,
+            limit=limit,
+        )
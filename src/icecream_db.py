@@ -1,56 +1,220 @@
-from pathlib import Path
-from dbaccess import DB_Access
+import asyncio
+import time
+from contextlib import asynccontextmanager, contextmanager
 from typing import Any
-from icecream import IceCream
+from icecream import NO_DESCRIPTION, IceCream, assemble_icecream
+from icecream_logging import get_logger
+from icecream_notify import ICECREAM_CHANGED_CHANNEL
+from icecream_store import Icecream_Store
+from metrics import db_acquire_duration, db_execute_duration, row_mapping_duration
 from psycopg_pool import ConnectionPool, AsyncConnectionPool
 
+logger = get_logger(__name__)
+
 def Row2Icecreams(column_map, rows):
-    _icecreams = []
-    for row in rows:
-        _icecream = IceCream(
-            Id=int(row[column_map["ID"]]),
-            Name=row[column_map["Name"]],
-            Price=float(row[column_map["Price"]][1:] if row[column_map["Price"]][0] == "$" else row[column_map["Price"]]),
-            Quantity=int(row[column_map["Quantity"]]),
-            OnDisplay=bool(row[column_map["OnDisplay"]]),
-            Description=row[column_map["Description"]] if row[column_map["Description"]] else '(no description yet)'
-        )
-        _icecreams.append(_icecream)
+    """Builds IceCream models from rows of public."Icecream".
+
+    The rows come from our own table, so pydantic validation is skipped (see
+    ``assemble_icecream``). ``Price`` must already be a number: the queries
+    cast the money column with ``"Price"::numeric::float8``.
+    """
+    _start = time.perf_counter()
+    id_ix = column_map["ID"]
+    name_ix = column_map["Name"]
+    price_ix = column_map["Price"]
+    quantity_ix = column_map["Quantity"]
+    ondisplay_ix = column_map["OnDisplay"]
+    description_ix = column_map["Description"]
 
+    _icecreams = [
+        assemble_icecream({
+            "Id": row[id_ix],
+            "Name": row[name_ix],
+            "Price": row[price_ix],
+            "Quantity": row[quantity_ix],
+            "OnDisplay": bool(row[ondisplay_ix]),
+            "Description": row[description_ix] or NO_DESCRIPTION,
+        })
+        for row in rows
+    ]
+
+    row_mapping_duration.observe(time.perf_counter() - _start)
     return _icecreams
 
-class Icecream_DB():
-    def get_icecream_by_names(pool:ConnectionPool, names: list[str]) -> list[IceCream]:
-        sql_select = """
-                    SELECT "ID", "Name", "Price", "Quantity", "OnDisplay", "Description" 
-                    FROM public."Icecream"
-                    WHERE "Name" = ANY(%s)
-                    """
-        column_map, rows = Icecream_DB._query(pool=pool, sql_select=sql_select, params=[names])
-        return Row2Icecreams(column_map, rows)
+class Icecream_SQL():
+    """Registry of the fixed catalog statements.
 
-    def get_icecream_by_ids(pool:ConnectionPool, ids: list[str]) -> list[IceCream]:
-        sql_select = """
-                    SELECT "ID", "Name", "Price", "Quantity", "OnDisplay", "Description" 
+    Every query goes through these constants, so each statement always has
+    the same text. They are executed with ``prepare=True``, so psycopg
+    prepares each one server-side on its first use per connection, keyed by
+    its text, and then only binds and executes it. Other statements follow
+    the connection's ``prepare_threshold`` (ICECREAM_DB_PREPARE_THRESHOLD).
+    """
+
+    COLUMNS = '"ID", "Name", "Price"::numeric::float8 AS "Price", "Quantity", "OnDisplay", "Description"'
+
+    SELECT_ALL = f"""
+                 SELECT {COLUMNS}
+                 FROM public."Icecream"
+                 """
+
+    SELECT_ALL_ORDERED = f"""
+                         SELECT {COLUMNS}
+                         FROM public."Icecream"
+                         ORDER BY "ID"
+                         """
+
+    SELECT_BY_ID = f"""
+                   SELECT {COLUMNS}
+                   FROM public."Icecream"
+                   WHERE "ID" = %s
+                   """
+
+    SELECT_BY_IDS = f"""
+                    SELECT {COLUMNS}
                     FROM public."Icecream"
                     WHERE "ID" = ANY(%s)
                     """
-        column_map, rows = Icecream_DB._query(pool=pool, sql_select=sql_select, params=[ids])
+
+    SELECT_BY_NAMES = f"""
+                      SELECT {COLUMNS}
+                      FROM public."Icecream"
+                      WHERE "Name" = ANY(%s)
+                      """
+
+    SELECT_BY_IDS_OR_NAMES = f"""
+                             SELECT {COLUMNS}
+                             FROM public."Icecream"
+                             WHERE "ID" = ANY(%s) OR "Name" = ANY(%s)
+                             """
+
+    SELECT_PAGE = f"""
+                  SELECT {COLUMNS}
+                  FROM public."Icecream"
+                  WHERE "ID" > %s
+                  ORDER BY "ID"
+                  LIMIT %s
+                  """
+
+    # Served by the "Icecream_Name_lower_prefix_idx" index (migration 0003);
+    # the ORDER BY must match it for the scan to stop after LIMIT rows.
+    SEARCH_BY_NAME_PREFIX = f"""
+                            SELECT {COLUMNS}
+                            FROM public."Icecream"
+                            WHERE lower("Name") COLLATE "C" LIKE %s
+                            ORDER BY lower("Name") COLLATE "C", "ID"
+                            LIMIT %s
+                            """
+
+    INSERT = """
+             INSERT INTO public."Icecream" ("Name", "Price", "Quantity", "OnDisplay", "Description")
+             VALUES (%s, %s::numeric, %s, %s, %s)
+             RETURNING "ID"
+             """
+
+    # Unset (None) fields keep their value; the "Icecream_Name_key" unique
+    # index (migration 0002) rejects renames to a name already in use.
+    UPDATE = f"""
+             UPDATE public."Icecream"
+             SET "Name" = COALESCE(%(Name)s, "Name"),
+                 "Price" = COALESCE(%(Price)s::numeric::money, "Price"),
+                 "Quantity" = COALESCE(%(Quantity)s::integer, "Quantity"),
+                 "OnDisplay" = COALESCE(%(OnDisplay)s::boolean, "OnDisplay"),
+                 "Description" = COALESCE(%(Description)s, "Description")
+             WHERE "ID" = %(Id)s
+             RETURNING {COLUMNS}
+             """
+
+    # Conditional decrement: no row is returned (nothing changes) when the
+    # ice cream doesn't exist or has fewer than %(Quantity)s left.
+    SELL = f"""
+           UPDATE public."Icecream"
+           SET "Quantity" = "Quantity" - %(Quantity)s
+           WHERE "ID" = %(Id)s AND "Quantity" >= %(Quantity)s
+           RETURNING {COLUMNS}
+           """
+
+    SELECT_QUANTITY_FOR_UPDATE = """
+                                 SELECT "Quantity"
+                                 FROM public."Icecream"
+                                 WHERE "ID" = %s
+                                 FOR UPDATE
+                                 """
+
+    DELETE_BY_ID = """
+                   DELETE FROM public."Icecream"
+                   WHERE "ID" = %s
+                   RETURNING "ID"
+                   """
+
+    NOTIFY = "SELECT pg_notify(%s, %s)"
+
+def _notify_change(cnx, icecream_id: Any = None):
+    """Queues a change notification; Postgres delivers it when the transaction commits."""
+    cnx.execute(Icecream_SQL.NOTIFY, (ICECREAM_CHANGED_CHANNEL, "" if icecream_id is None else str(icecream_id)), prepare=True)
+
+async def _async_notify_change(cnx, icecream_id: Any = None):
+    """Async counterpart of ``_notify_change``."""
+    await cnx.execute(Icecream_SQL.NOTIFY, (ICECREAM_CHANGED_CHANNEL, "" if icecream_id is None else str(icecream_id)), prepare=True)
+
+# Metric label of each registry statement, e.g. "SELECT_BY_IDS".
+_SQL_NAMES = {_sql: _name for _name, _sql in vars(Icecream_SQL).items() if _name.isupper()}
+
+def _observe(query: str, requested: float, acquired: float):
+    """Records the pool wait and the time the connection was held for ``query``."""
+    released = time.perf_counter()
+    db_acquire_duration.observe(acquired - requested, query)
+    db_execute_duration.observe(released - acquired, query)
+    logger.debug("%s: acquire %.3f ms, execute %.3f ms", query, (acquired - requested) * 1000, (released - acquired) * 1000)
+
+@contextmanager
+def _timed_connection(pool: ConnectionPool, query: str):
+    """``pool.connection()``, timing the wait for it and how long it is held."""
+    requested = time.perf_counter()
+    with pool.connection() as cnx:
+        acquired = time.perf_counter()
+        try:
+            yield cnx
+        finally:
+            _observe(query, requested, acquired)
+
+@asynccontextmanager
+async def _async_timed_connection(pool: AsyncConnectionPool, query: str):
+    """Async counterpart of ``_timed_connection``."""
+    requested = time.perf_counter()
+    async with pool.connection() as cnx:
+        acquired = time.perf_counter()
+        try:
+            yield cnx
+        finally:
+            _observe(query, requested, acquired)
+
+_UPDATABLE_FIELDS = ("Name", "Price", "Quantity", "OnDisplay", "Description")
+
+def _update_params(icecream_id: int, fields: dict) -> dict:
+    params = {x: fields.get(x) for x in _UPDATABLE_FIELDS}
+    params["Id"] = icecream_id
+    return params
+
+def _prefix_pattern(prefix: str) -> str:
+    """LIKE pattern matching names that start with ``prefix``, ignoring case."""
+    escaped = prefix.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped + "%"
+
+class Icecream_DB():
+    def get_icecream_by_ids(pool:ConnectionPool, ids: list[str]) -> list[IceCream]:
+        column_map, rows = Icecream_DB._query(pool=pool, sql_select=Icecream_SQL.SELECT_BY_IDS, params=[ids])
         return Row2Icecreams(column_map, rows)
 
     def get_all_icecream(pool:ConnectionPool) -> list[IceCream]:
-        sql_select = """
-                    SELECT "ID", "Name", "Price", "Quantity", "OnDisplay", "Description" 
-                    FROM public."Icecream"
-                    """
-        column_map, rows = Icecream_DB._query(pool=pool, sql_select=sql_select)
+        column_map, rows = Icecream_DB._query(pool=pool, sql_select=Icecream_SQL.SELECT_ALL)
         return Row2Icecreams(column_map, rows)
 
     def _query(pool:ConnectionPool, sql_select: str, params:Any = None) -> Any:
-        with pool.connection() as cnx:
+        with _timed_connection(pool, _SQL_NAMES.get(sql_select, "OTHER")) as cnx:
             with cnx.cursor() as query_cur:
                 
-                query_cur.execute(sql_select, params) if params else query_cur.execute(sql_select)
+                query_cur.execute(sql_select, params, prepare=True) if params else query_cur.execute(sql_select, prepare=True)
                 rows = query_cur.fetchall()
 
                 column_map = dict([(x.name, i) for i, x in enumerate(query_cur.description)])
@@ -58,28 +222,20 @@ class Icecream_DB():
                 return (column_map, rows)
             
     def insert_icecream(pool:ConnectionPool, icecream:IceCream) -> IceCream:
-        with pool.connection() as cnx:
-            with cnx.cursor() as lock_cur:
-                lock_cur.execute("""
-                                LOCK TABLE public."Icecream" IN EXCLUSIVE MODE
-                                """)
-            with cnx.cursor() as query_cur:
-                query_cur.execute("""
-                                  SELECT MAX("ID") AS LAST_ID
-                                  FROM public."Icecream"
-                                  """)
-                LAST_ID = int(query_cur.fetchone()[0])
+        """Inserts ``icecream`` and sets its ``Id`` from the "ID" identity sequence.
+
+        Requires migration 0001_icecream_id_identity; concurrent inserts no
+        longer lock the table.
+        """
+        with _timed_connection(pool, "INSERT") as cnx:
             with cnx.cursor() as insert_cur:
-                icecream.Id = LAST_ID + 1
-                insert_cur.execute("""
-                                   INSERT INTO public."Icecream" ("ID", "Name", "Price", "Quantity", "OnDisplay", "Description")
-                                   VALUES (%s, %s, %s, %s, %s, %s)
-                                   """, (icecream.Id, 
-                                         icecream.Name, 
-                                         icecream.Price, 
-                                         icecream.Quantity, 
-                                         icecream.OnDisplay, 
-                                         icecream.Description))
+                insert_cur.execute(Icecream_SQL.INSERT, (icecream.Name,
+                                                         icecream.Price,
+                                                         icecream.Quantity,
+                                                         icecream.OnDisplay,
+                                                         icecream.Description), prepare=True)
+                icecream.Id = insert_cur.fetchone()[0]
+            _notify_change(cnx, icecream.Id)
         return icecream
         
 
@@ -88,83 +244,232 @@ class Icecream_DB():
 
 class AsyncIcecream_DB():
     async def async_get_icecream_by_names(pool:AsyncConnectionPool, names: list[str]) -> list[IceCream]:
-        _icecreams = []
-        sql_select = """
-                    SELECT "ID", "Name", "Price", "Quantity", "OnDisplay", "Description" 
-                    FROM public."Icecream"
-                    WHERE "Name" = ANY(%s)
-                    """
-        column_map, rows = await AsyncIcecream_DB._async_query(pool=pool, sql_select=sql_select, params=[names])
-        for row in rows:
-            _icecream = IceCream(
-                Id=int(row[column_map["ID"]]),
-                Name=row[column_map["Name"]],
-                Price=float(row[column_map["Price"]]),
-                Quantity=int(row[column_map["Quantity"]]),
-                OnDisplay=row[column_map["OnDisplay"]],
-                Description=row[column_map["OnDisplay"]]
-            )
-            _icecreams.append(_icecream)
-
-        return _icecreams
+        column_map, rows = await AsyncIcecream_DB._async_query(pool=pool, sql_select=Icecream_SQL.SELECT_BY_NAMES, params=[names])
+        return Row2Icecreams(column_map, rows)
 
     async def async_get_icecream_by_ids(pool:AsyncConnectionPool, ids: list[str]) -> list[IceCream]:
-        _icecreams = []
-        sql_select = """
-                    SELECT "ID", "Name", "Price", "Quantity", "OnDisplay", "Description" 
-                    FROM public."Icecream"
-                    WHERE "Name" = ANY(%s)
-                    """
-        column_map, rows = await AsyncIcecream_DB._async_query(pool=pool, sql_select=sql_select, params=[ids])
-        for row in rows:
-            _icecream = IceCream(
-                Id=int(row[column_map["ID"]]),
-                Name=row[column_map["Name"]],
-                Price=float(row[column_map["Price"]]),
-                Quantity=int(row[column_map["Quantity"]]),
-                OnDisplay=row[column_map["OnDisplay"]],
-                Description=row[column_map["OnDisplay"]]
+        column_map, rows = await AsyncIcecream_DB._async_query(pool=pool, sql_select=Icecream_SQL.SELECT_BY_IDS, params=[ids])
+        return Row2Icecreams(column_map, rows)
+
+    async def async_get_icecream_by_ids_or_names(
+        pool:AsyncConnectionPool, ids: list[str], names: list[str], concurrent: bool = False
+    ) -> list[IceCream]:
+        """Union of the id and name lookups.
+
+        By default this is a single statement; with ``concurrent`` the two
+        lookups run at the same time on separate pool connections instead.
+        """
+        if concurrent and ids and names:
+            by_ids, by_names = await asyncio.gather(
+                AsyncIcecream_DB.async_get_icecream_by_ids(pool=pool, ids=ids),
+                AsyncIcecream_DB.async_get_icecream_by_names(pool=pool, names=names),
             )
-            _icecreams.append(_icecream)
+            return list(dict.fromkeys(by_ids + by_names))
+
+        column_map, rows = await AsyncIcecream_DB._async_query(pool=pool, sql_select=Icecream_SQL.SELECT_BY_IDS_OR_NAMES, params=[ids or [], names or []])
+        return Row2Icecreams(column_map, rows)
+
+    async def async_get_icecream_page(pool:AsyncConnectionPool, after_id: int, limit: int) -> list[IceCream]:
+        """Keyset page: up to ``limit`` ice creams with ``"ID"`` greater than ``after_id``."""
+        column_map, rows = await AsyncIcecream_DB._async_query(pool=pool, sql_select=Icecream_SQL.SELECT_PAGE, params=[after_id, limit])
+        return Row2Icecreams(column_map, rows)
+
+    async def async_search_icecreams_by_name_prefix(pool:AsyncConnectionPool, prefix: str, limit: int) -> list[IceCream]:
+        """Up to ``limit`` ice creams whose name starts with ``prefix`` (case-insensitive), by name."""
+        column_map, rows = await AsyncIcecream_DB._async_query(pool=pool, sql_select=Icecream_SQL.SEARCH_BY_NAME_PREFIX, params=[_prefix_pattern(prefix), limit])
+        return Row2Icecreams(column_map, rows)
+
+    async def async_get_icecream_by_id(pool:AsyncConnectionPool, icecream_id: int) -> IceCream | None:
+        column_map, rows = await AsyncIcecream_DB._async_query(pool=pool, sql_select=Icecream_SQL.SELECT_BY_ID, params=[icecream_id])
+        _icecreams = Row2Icecreams(column_map, rows)
+        return _icecreams[0] if _icecreams else None
+
+    async def async_insert_icecream(pool:AsyncConnectionPool, icecream: Any) -> IceCream:
+        """Inserts ``icecream`` and returns it with the id assigned by the "ID" identity sequence.
+
+        Raises ``psycopg.errors.UniqueViolation`` when the name is taken.
+        """
+        async with _async_timed_connection(pool, "INSERT") as cnx:
+            async with cnx.cursor() as insert_cur:
+                await insert_cur.execute(Icecream_SQL.INSERT, (icecream.Name,
+                                                               icecream.Price,
+                                                               icecream.Quantity,
+                                                               icecream.OnDisplay,
+                                                               icecream.Description), prepare=True)
+                icecream_id = (await insert_cur.fetchone())[0]
+            await _async_notify_change(cnx, icecream_id)
+        return IceCream(
+            Id=icecream_id,
+            Name=icecream.Name,
+            Price=icecream.Price,
+            Quantity=icecream.Quantity,
+            OnDisplay=icecream.OnDisplay,
+            Description=icecream.Description,
+        )
+
+    async def async_update_icecream(pool:AsyncConnectionPool, icecream_id: int, fields: dict) -> IceCream | None:
+        """Sets the non-None ``fields`` of the ice cream with ``icecream_id``.
+
+        Returns the updated ice cream, or None when there is no such id.
+        Raises ``psycopg.errors.UniqueViolation`` when the new name is taken.
+        """
+        async with _async_timed_connection(pool, "UPDATE") as cnx:
+            async with cnx.cursor() as update_cur:
+                await update_cur.execute(Icecream_SQL.UPDATE, _update_params(icecream_id, fields), prepare=True)
+                rows = await update_cur.fetchall()
+                column_map = dict([(x.name, i) for i, x in enumerate(update_cur.description)])
+            if rows:
+                await _async_notify_change(cnx, icecream_id)
+        _icecreams = Row2Icecreams(column_map, rows)
+        return _icecreams[0] if _icecreams else None
 
-        return _icecreams
+    async def async_sell_icecream(pool:AsyncConnectionPool, icecream_id: int, quantity: int) -> IceCream | None:
+        """Takes ``quantity`` off the stock of ``icecream_id`` in one conditional UPDATE.
+
+        Returns the updated ice cream, or None when it doesn't exist or has
+        fewer than ``quantity`` left; the stock never goes negative.
+        """
+        async with _async_timed_connection(pool, "SELL") as cnx:
+            async with cnx.cursor() as sell_cur:
+                await sell_cur.execute(Icecream_SQL.SELL, {"Id": icecream_id, "Quantity": quantity}, prepare=True)
+                rows = await sell_cur.fetchall()
+                column_map = dict([(x.name, i) for i, x in enumerate(sell_cur.description)])
+            if rows:
+                await _async_notify_change(cnx, icecream_id)
+        _icecreams = Row2Icecreams(column_map, rows)
+        return _icecreams[0] if _icecreams else None
+
+    async def async_sell_icecream_batch(
+        pool:AsyncConnectionPool, icecream_id: int, quantities: list[int]
+    ) -> tuple[IceCream | None, list[bool]]:
+        """Applies several sales of ``icecream_id`` with a single row lock and UPDATE.
+
+        The sales are granted in order while stock remains, and their total
+        is taken off in one statement. Returns the ice cream as left after
+        the batch (None when it doesn't exist) and whether each sale was
+        granted.
+        """
+        async with _async_timed_connection(pool, "SELL") as cnx:
+            row = await (await cnx.execute(Icecream_SQL.SELECT_QUANTITY_FOR_UPDATE, [icecream_id], prepare=True)).fetchone()
+            if row is None:
+                return (None, [False] * len(quantities))
+
+            remaining = row[0]
+            granted = []
+            for quantity in quantities:
+                granted.append(quantity <= remaining)
+                if granted[-1]:
+                    remaining -= quantity
+            total = row[0] - remaining
+
+            async with cnx.cursor() as sell_cur:
+                if total:
+                    await sell_cur.execute(Icecream_SQL.SELL, {"Id": icecream_id, "Quantity": total}, prepare=True)
+                else:
+                    await sell_cur.execute(Icecream_SQL.SELECT_BY_ID, [icecream_id], prepare=True)
+                rows = await sell_cur.fetchall()
+                column_map = dict([(x.name, i) for i, x in enumerate(sell_cur.description)])
+            if total:
+                await _async_notify_change(cnx, icecream_id)
+        return (Row2Icecreams(column_map, rows)[0], granted)
+
+    async def async_delete_icecream_by_id(pool:AsyncConnectionPool, icecream_id: int) -> bool:
+        async with _async_timed_connection(pool, "DELETE_BY_ID") as cnx:
+            deleted = (await (await cnx.execute(Icecream_SQL.DELETE_BY_ID, [icecream_id], prepare=True)).fetchone()) is not None
+            if deleted:
+                await _async_notify_change(cnx, icecream_id)
+        return deleted
 
     async def async_get_all_icecreams(pool:AsyncConnectionPool) -> list[IceCream]:
-        _icecreams = []
-        sql_select = """
-                    SELECT "ID", "Name", "Price", "Quantity", "OnDisplay", "Description" 
-                    FROM public."Icecream"
-                    """
-        column_map, rows = await AsyncIcecream_DB._async_query(pool=pool, sql_select=sql_select)
-        for row in rows:
-            _icecream = IceCream(
-                Id=int(row[column_map["ID"]]),
-                Name=row[column_map["Name"]],
-                Price=float(row[column_map["Price"]]),
-                Quantity=int(row[column_map["Quantity"]]),
-                OnDisplay=row[column_map["OnDisplay"]],
-                Description=row[column_map["OnDisplay"]]
-            )
-            _icecreams.append(_icecream)
+        column_map, rows = await AsyncIcecream_DB._async_query(pool=pool, sql_select=Icecream_SQL.SELECT_ALL)
+        return Row2Icecreams(column_map, rows)
 
-        return _icecreams
+    async def async_get_icecream_store(pool:AsyncConnectionPool) -> Icecream_Store:
+        """The whole catalog as a columnar ``Icecream_Store``, without building IceCream models.
 
-    async def _async_query(pool:AsyncConnectionPool, sql_select: str, params:Any = None) -> Any:
-        print("[icecream_db.py].[AsyncIcecream_DB].[_async_query] - begin")
-        print(f"[icecream_db.py].[AsyncIcecream_DB].[_async_query] - validating state of connection pool: {pool.max_waiting}")
-        await pool.open()
-        
-        print("[icecream_db.py].[AsyncIcecream_DB].[_async_query] - pool opened")
+        Read in ID order, so the store's rows are already sorted and the
+        response body is the same on every replica.
+        """
+        column_map, rows = await AsyncIcecream_DB._async_query(pool=pool, sql_select=Icecream_SQL.SELECT_ALL_ORDERED)
+        _start = time.perf_counter()
+        # A catalog-sized build would block the event loop.
+        store = await asyncio.to_thread(Icecream_Store.from_rows, column_map, rows)
+        row_mapping_duration.observe(time.perf_counter() - _start)
+        return store
+
+    async def async_stream_all_icecreams(pool:AsyncConnectionPool, batch_size: int = 1000):
+        """Yields the whole catalog in batches of at most ``batch_size`` ice creams.
+
+        Rows are read through a server-side (named) cursor, so memory use is
+        bounded by ``batch_size`` rather than by the size of the table.
+        """
+        async with _async_timed_connection(pool, "STREAM_ALL") as cnx:
+            async with cnx.cursor(name="icecream_stream") as query_cur:
+                query_cur.itersize = batch_size
+                await query_cur.execute(Icecream_SQL.SELECT_ALL_ORDERED)
+                column_map = dict([(x.name, i) for i, x in enumerate(query_cur.description)])
+                while True:
+                    rows = await query_cur.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield Row2Icecreams(column_map, rows)
 
-        async with pool.connection() as cnx:
-            print(f"[icecream_db.py].[AsyncIcecream_DB].[_async_query] - connection server version: {cnx.info.server_version}")
+    async def async_bulk_insert_icecreams(pool:AsyncConnectionPool, icecreams: list[Any]) -> list[IceCream | None]:
+        """Inserts ``icecreams`` in one transaction and returns them with their new ids.
 
+        The rows are loaded with COPY into a temporary table and moved with a
+        single INSERT ... SELECT, instead of one INSERT per row. Names must be
+        unique within the batch. A name created concurrently by someone else
+        is skipped rather than failing the batch; its result is None.
+        """
+        if not icecreams:
+            return []
+
+        async with _async_timed_connection(pool, "BULK_INSERT") as cnx:
+            await cnx.execute("""
+                              CREATE TEMPORARY TABLE "IcecreamBulk" (
+                                  "Name" text, "Price" numeric, "Quantity" integer, "OnDisplay" boolean, "Description" text
+                              ) ON COMMIT DROP
+                              """)
+            async with cnx.cursor() as copy_cur:
+                async with copy_cur.copy("""
+                                         COPY "IcecreamBulk" ("Name", "Price", "Quantity", "OnDisplay", "Description") FROM STDIN
+                                         """) as copy:
+                    for _icecream in icecreams:
+                        await copy.write_row((_icecream.Name,
+                                              _icecream.Price,
+                                              _icecream.Quantity,
+                                              _icecream.OnDisplay,
+                                              _icecream.Description))
+            async with cnx.cursor() as insert_cur:
+                await insert_cur.execute("""
+                                         INSERT INTO public."Icecream" ("Name", "Price", "Quantity", "OnDisplay", "Description")
+                                         SELECT "Name", "Price", "Quantity", "OnDisplay", "Description" FROM "IcecreamBulk"
+                                         ON CONFLICT ("Name") DO NOTHING
+                                         RETURNING "ID", "Name"
+                                         """)
+                ids_by_name = {_name: _id for _id, _name in await insert_cur.fetchall()}
+            if ids_by_name:
+                await _async_notify_change(cnx)
+
+        return [
+            IceCream(
+                Id=ids_by_name[x.Name],
+                Name=x.Name,
+                Price=x.Price,
+                Quantity=x.Quantity,
+                OnDisplay=x.OnDisplay,
+                Description=x.Description,
+            ) if x.Name in ids_by_name else None
+            for x in icecreams
+        ]
+
+    async def _async_query(pool:AsyncConnectionPool, sql_select: str, params:Any = None) -> Any:
+        # The pool is opened once by the application lifespan (see AsyncDB_Access.open).
+        async with _async_timed_connection(pool, _SQL_NAMES.get(sql_select, "OTHER")) as cnx:
             async with cnx.cursor() as query_cur:
-                print(f"[icecream_db.py].[AsyncIcecream_DB].[_async_query] - cursor closed: {query_cur.closed}")
-                
-                await query_cur.execute(sql_select, params) if params else await query_cur.execute(sql_select)
+                await query_cur.execute(sql_select, params, prepare=True) if params else await query_cur.execute(sql_select, prepare=True)
                 rows = await query_cur.fetchall()
-                print(f"[icecream_db.py].[AsyncIcecream_DB].[_async_query] - rows retrieved: {len(rows)}")
 
                 column_map = dict([(x.name, i) for i, x in enumerate(query_cur.description)])
 
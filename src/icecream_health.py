@@ -0,0 +1,122 @@
+"""Readiness of a worker: database reachability, pool saturation and draining."""
+
+import asyncio
+import signal
+import threading
+import time
+
+from dbaccess import AsyncDB_Access
+from icecream_logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class Readiness_Check:
+    """Decides whether this worker should receive traffic; cheap enough to probe every second.
+
+    The database is checked with ``SELECT 1`` at most once per
+    ``db_check_interval`` seconds; probes in between reuse the cached
+    result, and concurrent probes share a single check. The worker is not
+    ready while the check fails, while more than ``max_waiting`` requests
+    are queued for a pool connection, or once it is draining for shutdown
+    (see ``drain_on_sigterm``).
+    """
+
+    def __init__(
+        self,
+        db_access: AsyncDB_Access,
+        db_check_interval: float = 5.0,
+        db_check_timeout: float = 1.0,
+        max_waiting: int = 0,
+    ):
+        self.db_access = db_access
+        self.db_check_interval = db_check_interval
+        self.db_check_timeout = db_check_timeout
+        self.max_waiting = max_waiting
+        self.draining = False
+        self._db_ok = False
+        self._db_error: str | None = None
+        self._db_checked_at: float | None = None
+        self._db_lock = asyncio.Lock()
+
+    def drain_on_sigterm(self, delay: float):
+        """Reports draining as soon as SIGTERM arrives, and passes it on to the server ``delay`` seconds later.
+
+        The server's own handler stops accepting connections, so delaying it
+        keeps the worker serving while load balancers see it isn't ready.
+        Call from the lifespan, once the server has installed its handlers.
+        """
+        if threading.current_thread() is not threading.main_thread():
+            return
+
+        loop = asyncio.get_running_loop()
+        previous = signal.getsignal(signal.SIGTERM)
+
+        def _pass_on(signum, frame):
+            if callable(previous):
+                previous(signum, frame)
+            else:
+                signal.signal(signum, previous)
+                signal.raise_signal(signum)
+
+        def _on_sigterm(signum, frame):
+            self.draining = True
+            loop.call_soon_threadsafe(loop.call_later, delay, _pass_on, signum, frame)
+
+        signal.signal(signal.SIGTERM, _on_sigterm)
+
+    def _db_check_is_current(self) -> bool:
+        return self._db_checked_at is not None and time.monotonic() - self._db_checked_at < self.db_check_interval
+
+    async def _check_db(self):
+        if self._db_check_is_current():
+            return
+
+        async with self._db_lock:
+            if self._db_check_is_current():
+                return
+            try:
+                async with self.db_access.ConnectionPool.connection(timeout=self.db_check_timeout) as cnx:
+                    await asyncio.wait_for(cnx.execute("SELECT 1"), self.db_check_timeout)
+                self._db_ok, self._db_error = True, None
+            except Exception as _err:
+                if self._db_ok or self._db_checked_at is None:
+                    logger.warning("Database check failed: %r", _err)
+                self._db_ok, self._db_error = False, repr(_err)
+            self._db_checked_at = time.monotonic()
+
+    async def check(self) -> tuple[bool, dict]:
+        """``(ready, details)``; details name the reasons when not ready."""
+        if self.draining:
+            return (False, {"ready": False, "reasons": ["draining"]})
+
+        reasons = []
+        stats = self.db_access.stats()
+        waiting = stats.get("requests_waiting", 0)
+        if self.max_waiting > 0 and waiting > self.max_waiting:
+            reasons.append("pool_saturated")
+        else:
+            # Not while saturated: the check would queue behind the waiting
+            # requests and report the database down.
+            await self._check_db()
+
+        if self._db_checked_at is not None and not self._db_ok:
+            reasons.append("database")
+
+        return (
+            not reasons,
+            {
+                "ready": not reasons,
+                "reasons": reasons,
+                "database": {
+                    "ok": self._db_ok,
+                    "error": self._db_error,
+                    "checked_ago": None if self._db_checked_at is None else round(time.monotonic() - self._db_checked_at, 3),
+                },
+                "pool": {
+                    "requests_waiting": waiting,
+                    "connections_in_use": stats.get("connections_in_use", 0),
+                    "max_size": stats.get("max_size", 0),
+                },
+            },
+        )
@@ -0,0 +1,43 @@
+"""Shared JSON encoding of API responses."""
+
+import time
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from pydantic_core import to_json
+
+from icecream import IceCream
+from metrics import json_encode_duration
+
+
+def encode(content: Any) -> bytes:
+    """Encodes ``content`` straight to UTF-8 JSON bytes.
+
+    ``IceCream`` and ``Error`` models, and lists and dicts holding them, are
+    serialized by pydantic-core in one pass, without building intermediate
+    dicts or going through ``json.dumps``.
+    """
+    _start = time.perf_counter()
+    body = to_json(content)
+    json_encode_duration.observe(time.perf_counter() - _start)
+    return body
+
+
+def encode_icecreams(icecreams: list[IceCream]) -> bytes:
+    """Encodes ice creams as one JSON array."""
+    return encode(icecreams)
+
+
+def encode_icecreams_ndjson(icecreams: list[IceCream]) -> bytes:
+    """Encodes ice creams as newline-delimited JSON, one object per line."""
+    _start = time.perf_counter()
+    body = b"".join([to_json(x) + b"\n" for x in icecreams])
+    json_encode_duration.observe(time.perf_counter() - _start)
+    return body
+
+
+class Icecream_JSONResponse(JSONResponse):
+    """``JSONResponse`` rendering its content with ``encode``; the app's default response class."""
+
+    def render(self, content: Any) -> bytes:
+        return encode(content)
@@ -0,0 +1,45 @@
+"""Leveled, sampled logging for the service.
+
+Modules log through ``get_logger(__name__)``. Warnings and errors are always
+emitted; DEBUG and INFO records, which can come from the per-request hot
+path, are kept with probability ``sample_rate``.
+"""
+
+import logging
+import random
+
+LOGGER_NAME = "icecream"
+
+
+class Sampling_Filter(logging.Filter):
+    """Passes every WARNING and above, and a ``sample_rate`` fraction of lower records."""
+
+    def __init__(self, sample_rate: float = 1.0):
+        super().__init__()
+        self.sample_rate = sample_rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.WARNING or self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+
+def get_logger(module_name: str) -> logging.Logger:
+    return logging.getLogger(f"{LOGGER_NAME}.{module_name}")
+
+
+def configure_logging(level: str = "INFO", sample_rate: float = 1.0):
+    """Sets the level and sampling of the service loggers, in the ``[module].[function]: message`` format."""
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(level.upper())
+
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(module)s].[%(funcName)s]: %(message)s"))
+        logger.addHandler(handler)
+        logger.propagate = False
+
+    # On the handlers: logger filters don't apply to records from child loggers.
+    for handler in logger.handlers:
+        for _filter in list(handler.filters):
+            if isinstance(_filter, Sampling_Filter):
+                handler.removeFilter(_filter)
+        handler.addFilter(Sampling_Filter(sample_rate))
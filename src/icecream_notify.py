@@ -0,0 +1,62 @@
+"""Postgres LISTEN/NOTIFY plumbing for catalog change notifications."""
+
+import asyncio
+from typing import Callable
+
+import psycopg
+
+from icecream_logging import get_logger
+
+ICECREAM_CHANGED_CHANNEL = "icecream_changed"
+
+logger = get_logger(__name__)
+
+
+class Icecream_Change_Listener:
+    """Listens on ``ICECREAM_CHANGED_CHANNEL`` and calls the subscribers.
+
+    Subscribers receive the notification payload (the changed id, when
+    known). They are also called with ``None`` every time the listener
+    (re)connects, because notifications sent while disconnected are lost.
+    """
+
+    def __init__(self, conninfo: str, retry_seconds: float = 5.0):
+        self.conninfo = conninfo
+        self.retry_seconds = retry_seconds
+        self.subscribers: list[Callable[[str | None], None]] = []
+        self._task: asyncio.Task | None = None
+
+    def subscribe(self, callback: Callable[[str | None], None]):
+        self.subscribers.append(callback)
+
+    def _publish(self, payload: str | None):
+        for callback in self.subscribers:
+            callback(payload)
+
+    async def run(self):
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(self.conninfo, autocommit=True) as cnx:
+                    await cnx.execute(f"LISTEN {ICECREAM_CHANGED_CHANNEL}")
+                    self._publish(None)
+                    async for notify in cnx.notifies():
+                        self._publish(notify.payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception as _err:
+                logger.warning("%s; retrying in %ss", _err, self.retry_seconds)
+                self._publish(None)
+                await asyncio.sleep(self.retry_seconds)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
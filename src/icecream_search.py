@@ -0,0 +1,40 @@
+"""In-process, case-insensitive name prefix search over a catalog snapshot."""
+
+from array import array
+from bisect import bisect_left
+
+from icecream import IceCream
+from icecream_store import Icecream_Store
+
+
+class Name_Prefix_Index:
+    """Rows of an ``Icecream_Store`` sorted by lowercased name, searched by prefix with a binary search.
+
+    Equivalent to a prefix trie for these queries, with one key per ice
+    cream instead of one node per character. Results are ordered like
+    ``Icecream_SQL.SEARCH_BY_NAME_PREFIX`` (code point order of the
+    lowercased name, then id), so both paths rank matches the same way.
+    """
+
+    def __init__(self, store: Icecream_Store):
+        # Names that are already lower case share the store's string.
+        lowered = [x if (y := x.lower()) == x else y for x in store.names]
+        ids = store.ids
+        rows = sorted(range(len(store)), key=lambda x: (lowered[x], ids[x]))
+        self._keys = [lowered[x] for x in rows]
+        self._rows = array('q', rows)
+        self._store = store
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def search(self, prefix: str, limit: int) -> list[IceCream]:
+        """Up to ``limit`` ice creams whose name starts with ``prefix``, ignoring case."""
+        prefix = prefix.lower()
+        keys = self._keys
+        start = bisect_left(keys, prefix)
+        end = min(start + limit, len(keys))
+        stop = start
+        while stop < end and keys[stop].startswith(prefix):
+            stop += 1
+        return [self._store.get(x) for x in self._rows[start:stop]]
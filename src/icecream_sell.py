@@ -0,0 +1,84 @@
+"""Coalescing of concurrent sales of the same ice cream into one UPDATE."""
+
+import asyncio
+
+from config import get_async_db_access, get_settings
+from dbaccess import AsyncDB_Access
+from icecream import IceCream
+from icecream_db import AsyncIcecream_DB
+
+
+class Sell_Coalescer:
+    """Applies the sales of a hot ice cream in batches instead of one row lock each.
+
+    Sales of the same id arriving within ``window_ms`` milliseconds of the
+    first one are applied together by ``async_sell_icecream_batch``: one
+    row lock and one UPDATE for the whole batch, granted in arrival order
+    while stock remains. Granted sales all see the ice cream as left after
+    their batch.
+
+    A sale that has been queued goes through even if its caller goes away.
+    """
+
+    def __init__(self, db_access: AsyncDB_Access, window_ms: float = 5.0):
+        self.db_access = db_access
+        self.window = window_ms / 1000
+        self.batches = 0
+        self.sales = 0
+        self.largest_batch = 0
+        self._pending: dict[int, list[tuple[int, asyncio.Future]]] = {}
+        self._running: set[asyncio.Task] = set()
+
+    async def sell(self, icecream_id: int, quantity: int) -> tuple[IceCream | None, bool]:
+        """``(icecream, granted)``; icecream is None when there is no such ice cream."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        pending = self._pending.get(icecream_id)
+        if pending is None:
+            pending = self._pending[icecream_id] = []
+            loop.call_later(self.window, self._dispatch, icecream_id)
+        pending.append((quantity, future))
+        return await asyncio.shield(future)
+
+    def _dispatch(self, icecream_id: int):
+        batch = self._pending.pop(icecream_id, None)
+        if not batch:
+            return
+
+        self.batches += 1
+        self.sales += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        task = asyncio.ensure_future(self._resolve(icecream_id, batch))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _resolve(self, icecream_id: int, batch: list[tuple[int, asyncio.Future]]):
+        try:
+            icecream, granted = await AsyncIcecream_DB.async_sell_icecream_batch(
+                self.db_access.ConnectionPool, icecream_id, [x for x, _ in batch]
+            )
+        except Exception as _err:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(_err)
+            return
+
+        for (_, future), _granted in zip(batch, granted):
+            if not future.done():
+                future.set_result((icecream, _granted))
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "sales": self.sales,
+            "largest_batch": self.largest_batch,
+            "window_ms": self.window * 1000,
+        }
+
+
+_settings = get_settings()
+sell_coalescer = (
+    Sell_Coalescer(db_access=get_async_db_access(), window_ms=_settings.icecream_sell_coalesce_ms)
+    if _settings.icecream_sell_coalesce_ms > 0
+    else None
+)
@@ -1,15 +1,31 @@
 """Main function to run."""
 
-from config import APP_PORT
+from pathlib import Path
 import sys
 import uvicorn
-from app import app
+from config import get_settings
+
+
 def main() -> int:
     """Entry function.
 
+    Runs APP_WORKERS server processes; each imports `app` itself and so
+    creates its own connection pool. On SIGTERM a worker reports draining on
+    /health/ready for APP_DRAIN_SECONDS, then uvicorn stops accepting
+    connections and lets in-flight requests finish for up to
+    APP_GRACEFUL_SHUTDOWN_TIMEOUT seconds before the lifespan closes the pool.
+
     :return: zero on sucecssful exit.
     """
-    uvicorn.run(app=app, host="0.0.0.0", port=int(APP_PORT))
+    settings = get_settings()
+    uvicorn.run(
+        app="app:app",
+        app_dir=str(Path(__file__).resolve().parent),
+        host="0.0.0.0",
+        port=int(settings.app_port),
+        workers=settings.app_workers,
+        timeout_graceful_shutdown=settings.app_graceful_shutdown_timeout,
+    )
     return 0
 
 
@@ -0,0 +1,156 @@
+"""In-process latency histograms exposed in the Prometheus text format.
+
+Each uvicorn worker keeps its own registry, so ``/metrics`` reports the
+worker that served the scrape; every sample carries a ``worker`` label
+(the process id) to tell them apart.
+"""
+
+import os
+import time
+from bisect import bisect_left
+from typing import Callable
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; fine-grained at the low end, where the DB and encoding steps fall.
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+WORKER = str(os.getpid())
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{x}="{_escape(y)}"' for x, y in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram, one series per combination of label values."""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = ("worker", *labelnames)
+        self.buckets = tuple(buckets)
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, value: float, *labelvalues: str):
+        key = (WORKER, *labelvalues)
+        series = self._series.get(key)
+        if series is None:
+            # Per-bucket counts (plus +Inf), sum
+            series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Histograms plus ``collectors``: callables returning gauge values at scrape time."""
+
+    def __init__(self):
+        self.histograms: list[Histogram] = []
+        self.collectors: list[Callable[[], dict[str, tuple[str, float]]]] = []
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        histogram = Histogram(name, documentation, labelnames, buckets)
+        self.histograms.append(histogram)
+        return histogram
+
+    def add_collector(self, collector: Callable[[], dict[str, tuple[str, float]]]):
+        """Registers ``collector() -> {name: (documentation, value)}``, reported as gauges."""
+        self.collectors.append(collector)
+
+    def render(self) -> bytes:
+        lines = []
+        for histogram in self.histograms:
+            lines.extend(histogram.render())
+        for collector in self.collectors:
+            for name, (documentation, value) in collector().items():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f'{name}{{worker="{WORKER}"}} {value}')
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+registry = Registry()
+
+http_request_duration = registry.histogram(
+    "icecream_http_request_duration_seconds",
+    "Time to handle an HTTP request, by method, route template and status code.",
+    ("method", "route", "status"),
+)
+db_acquire_duration = registry.histogram(
+    "icecream_db_pool_acquire_seconds",
+    "Time waiting for a pool connection, by statement.",
+    ("query",),
+)
+db_execute_duration = registry.histogram(
+    "icecream_db_query_seconds",
+    "Time executing a statement and fetching its rows, by statement.",
+    ("query",),
+)
+row_mapping_duration = registry.histogram(
+    "icecream_row_mapping_seconds",
+    "Time turning result rows into IceCream objects (Row2Icecreams).",
+)
+json_encode_duration = registry.histogram(
+    "icecream_json_encode_seconds",
+    "Time encoding response bodies to JSON.",
+)
+
+
+class Metrics_Middleware:
+    """ASGI middleware recording ``http_request_duration`` for every HTTP request.
+
+    Requests are labelled with the matched route template (``/icecream/{req_id}``),
+    not the raw path, so the number of series stays bounded.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def _send(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        _start = time.perf_counter()
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            route = scope.get("route")
+            http_request_duration.observe(
+                time.perf_counter() - _start,
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                str(status_code),
+            )
@@ -0,0 +1,110 @@
+"""Applies the SQL schema migrations in order.
+
+Migrations are the ``NNNN_description.sql`` files in ``migrations/`` at the
+repository root (or ``ICECREAM_MIGRATIONS_DIR``). Each one runs in its own
+transaction and is recorded in ``public.schema_migrations``, so re-running
+only applies new files. A file whose first line is
+``-- migrate: no-transaction`` runs in autocommit mode instead, for
+statements such as ``CREATE INDEX CONCURRENTLY``.
+
+A failed concurrent build leaves an INVALID index behind, which
+``IF NOT EXISTS`` would then skip. Such leftovers among the indexes a
+no-transaction migration names are dropped before it runs, and it is
+only recorded once none of them is invalid.
+"""
+
+import argparse
+import sys
+from os import getenv
+from pathlib import Path
+
+import psycopg
+from psycopg.sql import SQL, Identifier
+
+MIGRATIONS_DIR = Path(getenv('ICECREAM_MIGRATIONS_DIR', Path(__file__).resolve().parent.parent / 'migrations'))
+NO_TRANSACTION_MARKER = '-- migrate: no-transaction'
+
+# Serializes concurrent runners, e.g. several pods starting at once.
+_ADVISORY_LOCK_KEY = 0x1CEC4EA3
+
+
+def pending_migrations(cnx: psycopg.Connection, migrations_dir: Path) -> list[Path]:
+    cnx.execute("""
+                CREATE TABLE IF NOT EXISTS public.schema_migrations (
+                    "Version" text PRIMARY KEY,
+                    "AppliedAt" timestamptz NOT NULL DEFAULT now()
+                )
+                """)
+    applied = {row[0] for row in cnx.execute('SELECT "Version" FROM public.schema_migrations')}
+    return [x for x in sorted(migrations_dir.glob('*.sql')) if x.stem not in applied]
+
+
+def invalid_indexes(cnx: psycopg.Connection, sql: str) -> list[str]:
+    """The invalid indexes in ``public`` that ``sql`` names (as quoted identifiers)."""
+    rows = cnx.execute("""
+                       SELECT c.relname
+                       FROM pg_index i
+                       JOIN pg_class c ON c.oid = i.indexrelid
+                       JOIN pg_namespace n ON n.oid = c.relnamespace
+                       WHERE n.nspname = 'public' AND NOT i.indisvalid
+                       """)
+    return [name for (name,) in rows if f'"{name}"' in sql]
+
+
+def apply_migration(cnx: psycopg.Connection, migration: Path):
+    sql = migration.read_text()
+    if sql.lstrip().startswith(NO_TRANSACTION_MARKER):
+        for name in invalid_indexes(cnx, sql):
+            print(f"[{Path(__file__).name}].[apply_migration]: dropping invalid index {name} left by an earlier attempt")
+            cnx.execute(SQL('DROP INDEX CONCURRENTLY IF EXISTS public.{}').format(Identifier(name)))
+        try:
+            cnx.execute(sql)
+        except psycopg.errors.UniqueViolation as _err:
+            raise RuntimeError(
+                f"{migration.name}: existing rows violate the new unique index ({_err.diag.message_detail}). "
+                "Resolve the duplicates and re-run."
+            ) from _err
+        invalid = invalid_indexes(cnx, sql)
+        if invalid:
+            raise RuntimeError(f"{migration.name}: index {', '.join(invalid)} is invalid; not recording it as applied")
+        cnx.execute('INSERT INTO public.schema_migrations ("Version") VALUES (%s)', (migration.stem,))
+        return
+
+    with cnx.transaction():
+        cnx.execute(sql)
+        cnx.execute('INSERT INTO public.schema_migrations ("Version") VALUES (%s)', (migration.stem,))
+
+
+def migrate(conninfo: str, migrations_dir: Path = MIGRATIONS_DIR, dry_run: bool = False) -> list[str]:
+    """Applies the pending migrations and returns their versions."""
+    with psycopg.connect(conninfo, autocommit=True) as cnx:
+        cnx.execute('SELECT pg_advisory_lock(%s)', (_ADVISORY_LOCK_KEY,))
+        try:
+            pending = pending_migrations(cnx, migrations_dir)
+            for migration in pending:
+                print(f"[{Path(__file__).name}].[migrate]: {'would apply' if dry_run else 'applying'} {migration.name}")
+                if not dry_run:
+                    apply_migration(cnx, migration)
+            return [x.stem for x in pending]
+        finally:
+            cnx.execute('SELECT pg_advisory_unlock(%s)', (_ADVISORY_LOCK_KEY,))
+
+
+def main() -> int:
+    """Entry function.
+
+    :return: zero on successful exit.
+    """
+    parser = argparse.ArgumentParser(description='Apply pending schema migrations.')
+    parser.add_argument('--dir', type=Path, default=MIGRATIONS_DIR, help='migrations directory')
+    parser.add_argument('--dry-run', action='store_true', help='list pending migrations without applying them')
+    args = parser.parse_args()
+
+    from config import get_db_access
+
+    migrate(get_db_access().conninfo, migrations_dir=args.dir, dry_run=args.dry_run)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,47 @@
+"""Read-your-writes routing for clients that just changed the catalog."""
+
+import time
+
+from fastapi import Request, Response
+
+from config import get_settings
+
+COOKIE_NAME = "icecream_rw"
+
+
+class Read_Your_Writes:
+    """Tells which requests must read from the primary rather than a replica.
+
+    A successful write sets a short-lived cookie holding the time until which
+    the client's reads go to the primary; by then the replicas have caught
+    up. Does nothing when ``enabled`` is false, i.e. without replicas.
+    """
+
+    def __init__(self, window: float = 5.0, enabled: bool = True):
+        self.window = window
+        self.enabled = enabled and window > 0
+
+    def mark_write(self, response: Response) -> Response:
+        if self.enabled:
+            response.set_cookie(
+                COOKIE_NAME,
+                str(int(time.time() + self.window) + 1),
+                max_age=int(self.window) + 1,
+                httponly=True,
+                samesite="lax",
+            )
+        return response
+
+    def wants_primary(self, request: Request) -> bool:
+        if not self.enabled:
+            return False
+        try:
+            return float(request.cookies.get(COOKIE_NAME, 0)) > time.time()
+        except ValueError:
+            return False
+
+
+_settings = get_settings()
+read_your_writes = Read_Your_Writes(
+    window=_settings.icecream_read_your_writes_seconds, enabled=bool(_settings.icecream_db_reader_hosts)
+)
@@ -0,0 +1,212 @@
+"""Negotiated response compression (gzip, and brotli/zstd when installed)."""
+
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # optional: pip install brotli
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional: pip install zstandard
+    zstandard = None
+
+
+# Server preference when the client accepts several encodings equally.
+PREFERRED_ENCODINGS = ("zstd", "br", "gzip")
+
+# Levels for compressing per response (cheap) and for the precomputed catalog
+# variants, which are compressed once per catalog version. Every write starts
+# a new version, so those stay moderate too: br 11 and zstd 19 take seconds
+# on a large catalog for a few percent smaller bodies.
+DYNAMIC_LEVELS = {"gzip": 6, "br": 4, "zstd": 3}
+PRECOMPUTED_LEVELS = {"gzip": 9, "br": 5, "zstd": 6}
+
+COMPRESSIBLE_MEDIA_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+def available_encodings(names: list[str] | None = None) -> tuple[str, ...]:
+    """The encodings of ``names`` (default: all) that can be produced here, in preference order."""
+    installed = {"gzip": True, "br": brotli is not None, "zstd": zstandard is not None}
+    wanted = PREFERRED_ENCODINGS if names is None else names
+    return tuple(x for x in PREFERRED_ENCODINGS if x in wanted and installed[x])
+
+
+def negotiate(accept_encoding: str, encodings: tuple[str, ...]) -> str | None:
+    """Best of ``encodings`` acceptable per an ``Accept-Encoding`` header, or None for identity."""
+    if not accept_encoding or not encodings:
+        return None
+
+    accepted = {}
+    for _item in accept_encoding.split(","):
+        _name, _, _params = _item.strip().partition(";")
+        _q = 1.0
+        _params = _params.strip()
+        if _params.startswith("q="):
+            try:
+                _q = float(_params[2:])
+            except ValueError:
+                _q = 0.0
+        accepted[_name.strip().lower()] = _q
+
+    wildcard = accepted.get("*", 0.0)
+    best, best_q = None, 0.0
+    for encoding in encodings:
+        _q = accepted.get(encoding, wildcard)
+        if _q > best_q:
+            best, best_q = encoding, _q
+    return best
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """The ETag of the ``encoding``-compressed representation of a body tagged ``etag``.
+
+    Strong ETags get the encoding as a suffix, since the bytes differ; weak
+    ones already allow for that and are kept.
+    """
+    if etag.startswith("W/"):
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def compress(body: bytes, encoding: str, level: int | None = None) -> bytes:
+    """``body`` compressed with ``encoding`` in one shot."""
+    if level is None:
+        level = DYNAMIC_LEVELS[encoding]
+    if encoding == "gzip":
+        _compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+        return _compressor.compress(body) + _compressor.flush()
+    if encoding == "br":
+        return brotli.compress(body, quality=level)
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=level).compress(body)
+    raise ValueError(f"Unsupported encoding {encoding}")
+
+
+def compress_variants(body: bytes, encodings: tuple[str, ...]) -> dict[str, bytes]:
+    """``body`` compressed with each of ``encodings`` at the precomputed levels."""
+    return {x: compress(body, x, PRECOMPUTED_LEVELS[x]) for x in encodings}
+
+
+class _Stream_Compressor:
+    """Compresses a streamed body chunk by chunk, flushing each chunk to the client."""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        level = DYNAMIC_LEVELS[encoding]
+        if encoding == "gzip":
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+        elif encoding == "br":
+            self._compressor = brotli.Compressor(quality=level)
+        else:
+            self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, chunk: bytes) -> bytes:
+        if self.encoding == "gzip":
+            return self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        if self.encoding == "br":
+            return self._compressor.process(chunk) + self._compressor.flush()
+        return self._compressor.compress(chunk) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+def _add_vary(headers: MutableHeaders):
+    vary = headers.get("vary")
+    if vary is None:
+        headers["Vary"] = "Accept-Encoding"
+    elif "accept-encoding" not in vary.lower():
+        headers["Vary"] = f"{vary}, Accept-Encoding"
+
+
+class Compression_Middleware:
+    """ASGI middleware compressing JSON and text responses per ``Accept-Encoding``.
+
+    Buffered bodies smaller than ``minimum_size`` bytes are sent as they are;
+    streamed bodies are compressed chunk by chunk. Responses that already
+    carry a ``Content-Encoding`` (such as the precompressed catalog) are left
+    untouched. The ``ETag`` of a compressed response becomes its
+    ``encoded_etag``, so that no strong ETag covers two representations.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, encodings: tuple[str, ...] | None = None):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encodings = available_encodings() if encodings is None else encodings
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""), self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        await self.app(scope, receive, _Compressing_Send(send, encoding, self.minimum_size).send)
+
+
+class _Compressing_Send:
+    def __init__(self, send: Send, encoding: str, minimum_size: int):
+        self._send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self._start: Message | None = None
+        self._passthrough = False
+        self._stream: _Stream_Compressor | None = None
+
+    async def send(self, message: Message):
+        if message["type"] == "http.response.start":
+            self._start = message
+            return
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self._passthrough:
+            await self._send(message)
+            return
+
+        if self._stream is not None:
+            chunk = self._stream.compress(body) if body else b""
+            if not more_body:
+                chunk += self._stream.finish()
+            await self._send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+            return
+
+        headers = MutableHeaders(raw=self._start["headers"])
+        if (
+            "content-encoding" in headers
+            or not headers.get("content-type", "").startswith(COMPRESSIBLE_MEDIA_TYPES)
+            or (not more_body and len(body) < self.minimum_size)
+        ):
+            self._passthrough = True
+            await self._send(self._start)
+            await self._send(message)
+            return
+
+        headers["Content-Encoding"] = self.encoding
+        _add_vary(headers)
+        if "etag" in headers:
+            headers["ETag"] = encoded_etag(headers["etag"], self.encoding)
+        if more_body:
+            del headers["content-length"]
+            self._stream = _Stream_Compressor(self.encoding)
+            body = self._stream.compress(body) if body else b""
+        else:
+            body = compress(body, self.encoding)
+            headers["Content-Length"] = str(len(body))
+
+        await self._send(self._start)
+        await self._send({"type": "http.response.body", "body": body, "more_body": more_body})
@@ -0,0 +1,55 @@
+"""Single-flight request coalescing: concurrent identical calls share one execution."""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class Single_Flight:
+    """Coalesces concurrent coroutine calls that share a key.
+
+    The first caller for a key starts ``fn`` as a task; callers arriving
+    while it is still running await the same task and receive its result
+    (or its exception). The key is forgotten as soon as the task finishes,
+    so results are never reused after the fact — caching is left to
+    ``Icecream_Cache``.
+
+    A caller being cancelled doesn't cancel the shared call, which other
+    callers may still be waiting on.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.shared = 0
+        self._flights: dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """Result of ``fn(*args, **kwargs)``, shared with concurrent callers of ``key``."""
+        flight = self._flights.get(key)
+        if flight is None:
+            self.calls += 1
+            flight = asyncio.ensure_future(fn(*args, **kwargs))
+            self._flights[key] = flight
+            flight.add_done_callback(lambda _flight: self._done(key, _flight))
+        else:
+            self.shared += 1
+
+        return await asyncio.shield(flight)
+
+    def _done(self, key: Hashable, flight: asyncio.Task):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.cancelled():
+            # Retrieve the exception so it isn't reported as unhandled when
+            # every caller was cancelled before the call completed.
+            flight.exception()
+
+    def forget(self, _payload: str | None = None):
+        """Detaches the calls in flight, so later callers start new ones.
+
+        Used as the change-notification callback: a caller arriving after a
+        change must not join a query that started before it.
+        """
+        self._flights.clear()
+
+    def stats(self) -> dict:
+        return {"calls": self.calls, "shared": self.shared, "in_flight": len(self._flights)}
@@ -0,0 +1,57 @@
+"""Pins the pydantic behaviour that ``assemble_icecream`` relies on.
+
+It skips validation by filling in the instance's ``__dict__`` and pydantic's
+private slots itself; a pydantic upgrade that changes that layout must fail
+here rather than in production.
+"""
+from icecream import IceCream, assemble_icecream
+from icecream_db import Row2Icecreams
+from icecream_store import Icecream_Store
+
+FIELDS = {"Id": 7, "Name": "Mango", "Price": 2.5, "Quantity": 5, "OnDisplay": True, "Description": "m"}
+
+
+def test_same_as_a_validated_model():
+    assembled = assemble_icecream(dict(FIELDS))
+    validated = IceCream(**FIELDS)
+
+    assert type(assembled) is IceCream
+    assert assembled == validated
+    assert assembled.model_dump() == validated.model_dump()
+    assert assembled.model_dump_json() == validated.model_dump_json()
+    assert assembled.model_fields_set == validated.model_fields_set
+    assert repr(assembled) == repr(validated)
+
+
+def test_model_copy_with_update():
+    assembled = assemble_icecream(dict(FIELDS))
+
+    copy = assembled.model_copy(update={"Quantity": 9})
+
+    assert copy.Quantity == 9
+    assert assembled.Quantity == 5
+    assert copy.model_dump() == {**FIELDS, "Quantity": 9}
+
+
+def test_instances_share_no_state():
+    first = assemble_icecream(dict(FIELDS))
+    second = assemble_icecream(dict(FIELDS))
+
+    assert first.__pydantic_fields_set__ is not second.__pydantic_fields_set__
+    first.Quantity = 1
+    assert second.Quantity == 5
+    assert second.model_fields_set == set(FIELDS)
+
+
+def test_row_mapping_and_store_agree_with_validation():
+    column_map = {"ID": 0, "Name": 1, "Price": 2, "Quantity": 3, "OnDisplay": 4, "Description": 5}
+    rows = [(7, "Mango", 2.5, 5, True, "m"), (8, "Plain", 1.0, 1, False, None)]
+    expected = [
+        IceCream(**FIELDS),
+        IceCream(Id=8, Name="Plain", Price=1.0, Quantity=1, OnDisplay=False, Description="(no description yet)"),
+    ]
+
+    assert Row2Icecreams(column_map, rows) == expected
+    store = Icecream_Store.from_rows(column_map, rows)
+    assert [store.get(x) for x in range(len(store))] == expected
+    assert [x.model_dump() for x in Row2Icecreams(column_map, rows)] == [x.model_dump() for x in expected]
@@ -0,0 +1,73 @@
+"""The GET /icecream snapshot before and after its variants are precompressed.
+
+No database: the catalog's snapshot is replaced, and the app's lifespan
+(which opens the pool) doesn't run without ``with TestClient(...)``.
+"""
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app as app_module
+from icecream import IceCream
+from icecream_catalog import Catalog_Snapshot
+from icecream_store import Icecream_Store
+from response_compression import compress_variants
+
+
+def _snapshot(precompressed: bool) -> Catalog_Snapshot:
+    store = Icecream_Store.from_icecreams([
+        IceCream(Id=x, Name=f"flavor {x}", Price=2.5, Quantity=3, OnDisplay=True, Description="d" * 40)
+        for x in range(1, 200)
+    ])
+    body = store.to_json()
+    return Catalog_Snapshot(
+        version=1,
+        generation=0,
+        built_at=time.monotonic(),
+        etag='"0123456789abcdef"',
+        body=body,
+        store=store,
+        variants=compress_variants(body, ("gzip",)) if precompressed else {},
+    )
+
+
+@pytest.fixture
+def client(monkeypatch):
+    def use(snapshot: Catalog_Snapshot) -> TestClient:
+        async def get_snapshot():
+            return snapshot
+
+        monkeypatch.setattr(app_module.catalog, "get_snapshot", get_snapshot)
+        return TestClient(app_module.app)
+
+    return use
+
+
+@pytest.mark.parametrize("precompressed", [False, True])
+def test_gzip_representation_has_its_own_etag(client, precompressed):
+    snapshot = _snapshot(precompressed)
+    _client = client(snapshot)
+
+    identity = _client.get("/icecream", headers={"Accept-Encoding": "identity"})
+    compressed = _client.get("/icecream", headers={"Accept-Encoding": "gzip"})
+
+    assert identity.headers.get("content-encoding") is None
+    assert identity.headers["etag"] == snapshot.etag
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.headers["etag"] == '"0123456789abcdef-gzip"'
+    assert compressed.content == snapshot.body  # decoded by the client
+
+
+@pytest.mark.parametrize("precompressed", [False, True])
+def test_revalidation_per_representation(client, precompressed):
+    _client = client(_snapshot(precompressed))
+
+    gzip_etag = _client.get("/icecream", headers={"Accept-Encoding": "gzip"}).headers["etag"]
+
+    revalidated = _client.get("/icecream", headers={"Accept-Encoding": "gzip", "If-None-Match": gzip_etag})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == gzip_etag
+
+    # The gzip ETag doesn't validate the identity representation.
+    assert _client.get("/icecream", headers={"Accept-Encoding": "identity", "If-None-Match": gzip_etag}).status_code == 200
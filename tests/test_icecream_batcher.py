@@ -0,0 +1,56 @@
+"""``Icecream_Batcher`` issues one query per key while that key's query is in flight."""
+import asyncio
+from types import SimpleNamespace
+
+from icecream import IceCream
+from icecream_batcher import Icecream_Batcher
+
+
+def _batcher(queries: list, release: asyncio.Event) -> Icecream_Batcher:
+    batcher = Icecream_Batcher(SimpleNamespace(ReaderPool=None), window_ms=1)
+
+    async def load_ids(_pool, ids):
+        queries.append(sorted(ids))
+        await release.wait()
+        return [IceCream(Id=x, Name=f"flavor {x}", Price=1.0, Quantity=1, OnDisplay=True, Description="d") for x in ids]
+
+    batcher._loaders["id"] = load_ids
+    return batcher
+
+
+def test_key_in_flight_is_joined_not_queried_again():
+    async def scenario():
+        queries, release = [], asyncio.Event()
+        batcher = _batcher(queries, release)
+
+        first = asyncio.ensure_future(batcher.load_ids(["1", "2"]))
+        await asyncio.sleep(0.01)  # the first batch is dispatched and waiting on the database
+        second = asyncio.ensure_future(batcher.load_ids(["2", "3"]))
+        await asyncio.sleep(0.01)
+        release.set()
+        return queries, await first, await second, batcher.stats()
+
+    queries, first, second, stats = asyncio.run(scenario())
+
+    assert queries == [[1, 2], [3]]
+    assert [x.Id for x in first] == [1, 2]
+    assert [x.Id for x in second] == [2, 3]
+    assert first[1] is second[0]
+    assert stats["joined"] == 1
+
+
+def test_forget_detaches_queries_in_flight():
+    async def scenario():
+        queries, release = [], asyncio.Event()
+        batcher = _batcher(queries, release)
+
+        first = asyncio.ensure_future(batcher.load_ids(["1"]))
+        await asyncio.sleep(0.01)
+        batcher.forget()
+        second = asyncio.ensure_future(batcher.load_ids(["1"]))
+        await asyncio.sleep(0.01)
+        release.set()
+        await asyncio.gather(first, second)
+        return queries
+
+    assert asyncio.run(scenario()) == [[1], [1]]
@@ -0,0 +1,35 @@
+"""Enforces ``benchmarks/bench_import_time.py``'s budgets in the test run.
+
+Each module is imported in fresh interpreters under ``-X importtime``; its
+median must stay within ``DEFAULT_BUDGETS`` and it must not pull in the
+modules ``LAZY_IMPORTS`` keeps out of it. Timings are meaningless under
+coverage tracing, so the budgets are skipped there; the lazy imports are
+still checked.
+"""
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
+
+from bench_import_time import DEFAULT_BUDGETS, measure_module  # noqa: E402
+
+RUNS = 3
+
+UNDER_COVERAGE = sys.gettrace() is not None or "coverage" in sys.modules or "COV_CORE_SOURCE" in os.environ
+
+
+@pytest.fixture(scope="module", params=sorted(DEFAULT_BUDGETS))
+def measured(request) -> dict:
+    return measure_module(request.param, RUNS)
+
+
+def test_no_unexpected_imports(measured):
+    assert measured["unexpected_imports"] == [], measured
+
+
+@pytest.mark.skipif(UNDER_COVERAGE, reason="import times are inflated under coverage")
+def test_within_budget(measured):
+    assert measured["median_ms"] <= DEFAULT_BUDGETS[measured["module"]], measured
@@ -0,0 +1,35 @@
+"""``/health/ready`` reports draining from the moment a worker gets SIGTERM."""
+import asyncio
+import signal
+
+import httpx
+
+import app as app_module
+
+
+def test_sigterm_marks_draining_before_passing_it_on(monkeypatch):
+    monkeypatch.setattr(app_module.readiness, "draining", False)
+    passed_on = []
+    original = signal.signal(signal.SIGTERM, lambda signum, _frame: passed_on.append(signum))
+
+    async def scenario():
+        app_module.readiness.drain_on_sigterm(0.2)
+        signal.raise_signal(signal.SIGTERM)
+
+        # Still serving, and not ready: the server hasn't seen the signal yet.
+        transport = httpx.ASGITransport(app=app_module.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get("/health/ready")
+        assert passed_on == []
+
+        await asyncio.sleep(0.3)
+        return response
+
+    try:
+        response = asyncio.run(scenario())
+    finally:
+        signal.signal(signal.SIGTERM, original)
+
+    assert response.status_code == 503
+    assert response.json()["reasons"] == ["draining"]
+    assert passed_on == [signal.SIGTERM]